@@ -6,12 +6,19 @@ Created on Tue Jan 28 08:45:12 2025
 """
 
 #import pyvisa
+import os
+import sys
 import time
-import matplotlib.pyplot as plt
+import csv
+import datetime
 import OWONSerial
 import argparse
 import keyboard
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from OwenPlot import LivePlot
+from OwenIntegrator import EnergyIntegrator
+
 # Configuration
 
 XDM1141_ADDRESS = "ASRL3::INSTR"  # Replace with your device's VISA address
@@ -27,66 +34,54 @@ def main():
     parser.add_argument('--duration', type=int, default=7200, help='Duration of the measurement in seconds (default: 60)')
     parser.add_argument('--interval', type=float, default=60.0, help='Interval between measurements in seconds (default: 1.0)')
 
-    # Prepare data storage
-    timestamps = []
-    voltages = []
-    currents = []
-    
     args = parser.parse_args()
-    start_time = time.time()  # Record the start time
-    try:
-        # Initialize SCPI interface
-        device = OWONSerial.SCPI(port_dev=args.port, speed=args.baudrate)
-        print(f"Connected to device on port {args.port}")
+    start_time = time.perf_counter()  # Record the start time
+    device = None
+    integrator = EnergyIntegrator()
+    # Log for OwenIntegrator.py, written as the run goes so a crash keeps it
+    filename = datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + "_charge.dat"
+    logfile = open(filename, mode="w", newline="")
+    writer = csv.writer(logfile)
+    writer.writerow(["Time (s)", "Voltage (V)", "Current (A)"])
 
-        # Query device identification
-        idn = device.sendcmd("*IDN?")
-        print(f"Device ID: {idn}")
-        while True:
+    def acquire(plot):
+        # Runs on a worker thread; only pushes samples, never waits on the plot
+        while not plot.stopped:
             # Perform voltage and current measurements
+            before = time.perf_counter()
             V,I=OWONSerial.measure_a_voltage_and_current(device)
-            # Store data
-
-            voltages.append(V)
-            currents.append(I)
-            elapsed_time = time.time() - start_time
-            timestamps.append(elapsed_time)
-            print(f"Time: {elapsed_time:.2f}s, Voltage: {V:.5f} V, Current: {I:.5f} A")
+            # Stamp the middle of the exchange, not the moment it returned
+            elapsed_time = 0.5 * (before + time.perf_counter()) - start_time
+            plot.push(elapsed_time, V, I)
+            integrator.update(elapsed_time, V, I)
+            writer.writerow([f"{elapsed_time:.4f}", V, I])
+            logfile.flush()
+            print(f"Time: {elapsed_time:.2f}s, Voltage: {V:.5f} V, Current: {I:.5f} A, {integrator}")
 
             # Wait for the next measurement interval
             time.sleep(MEASUREMENT_INTERVAL)
             if keyboard.is_pressed("q"):  # Change "q" to any key you want
                 print("\nKey pressed! Exiting loop.")
-                break            
+                plot.stop()
+
+    try:
+        # Initialize SCPI interface
+        device = OWONSerial.SCPI(port_dev=args.port, speed=args.baudrate)
+        print(f"Connected to device on port {args.port}")
+
+        # Query device identification
+        idn = device.sendcmd("*IDN?")
+        print(f"Device ID: {idn}")
+        print("Close the plot window to stop")
+        LivePlot(title="Charge log").run(acquire)
     except Exception as e:
         print(f"Error: {e}")
     finally:
         del device    
+        logfile.close()
         print("Measurement completed.")
-        # Plot the results
-        plot_measurements(timestamps, voltages, currents)
-
-def plot_measurements(timestamps, voltages, currents):
-    """Plot the voltage and current over time."""
-    plt.figure(figsize=(12, 6))
-
-    # Plot voltage
-    plt.subplot(2, 1, 1)
-    plt.plot(timestamps, voltages, label="Voltage (V)", color="blue")
-    plt.ylabel("Voltage (V)")
-    plt.grid(True)
-    plt.legend()
-
-    # Plot current
-    plt.subplot(2, 1, 2)
-    plt.plot(timestamps, currents, label="Current (A)", color="green")
-    plt.xlabel("Time (s)")
-    plt.ylabel("Current (A)")
-    plt.grid(True)
-    plt.legend()
-
-    plt.tight_layout()
-    plt.show()
+        print(f"Total: {integrator}")
+        print(f"Log saved as '{filename}'")
     
     
 if __name__ == "__main__":
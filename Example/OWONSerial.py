@@ -10,89 +10,14 @@ Created on Tue Jan 28 09:00:38 2025
 
 import serial
 import argparse
+import os
+import sys
 from time import sleep
 import time
 
-
-from enum import Enum
-
-class SCPICommand(Enum):
-    # System Commands
-    IDENTIFY = "*IDN?"
-    REMOTE_MODE = "SYST:REM"
-    LOCAL_MODE = "SYST:LOC"
-    
-    # Measurement Commands
-    MEASURE = "MEAS?"
-    MEASURE_VOLT = "MEAS:VOLT?"
-    MEASURE_CURRENT = "MEAS:CURRENT?"
-    
-    MEASURE_1 = "MEAS1?"
-    MEASURE_2 = "MEAS2?"
-    MEASURE_SHOW = "MEAS:SHOW?"
-    MEASURE_1_SHOW = "MEAS1:SHOW?"
-    MEASURE_2_SHOW = "MEAS2:SHOW?"
-
-    # Function Selection
-    FUNCTION = "FUNC?"
-    FUNCTION_1 = "FUNC1?"
-    FUNCTION_2 = "FUNC2?"
-    
-    # Configuration Commands
-    CONF_VOLT_DC_AUTO = "CONF:VOLT:DC AUTO"
-    CONF_VOLT_DC = "CONF:VOLT:DC"
-    CONF_VOLT_AC_AUTO = "CONF:VOLT:AC AUTO"
-    CONF_CURR_DC_AUTO = "CONF:CURR:DC AUTO"
-    CONF_CURR_DC = "CONF:CURR:DC"
-    CONF_CURR_AC_AUTO = "CONF:CURR:AC AUTO"
-    CONF_RES_AUTO = "CONF:RES AUTO"
-    CONF_CAP_AUTO = "CONF:CAP AUTO"
-    CONF_FREQ = "CONF:FREQ"
-    CONF_PER = "CONF:PER"
-    CONF_DIOD = "CONF:DIOD"
-    CONF_CONT = "CONF:CONT"
-    CONF_TEMP_RTD = "CONF:TEMP:RTD"
-
-    # Temperature Settings
-    TEMP_RTD_UNIT_C = "TEMP:RTD:UNIT C"
-    TEMP_RTD_UNIT_F = "TEMP:RTD:UNIT F"
-    TEMP_RTD_UNIT_K = "TEMP:RTD:UNIT K"
-    TEMP_RTD_SHOW_TEMP = "TEMP:RTD:SHOW TEMP"
-    TEMP_RTD_SHOW_MEAS = "TEMP:RTD:SHOW MEAS"
-    TEMP_RTD_SHOW_ALL = "TEMP:RTD:SHOW ALL"
-
-    # Beep Control
-    BEEP_STATUS = "BEEP:STAT?"
-    BEEP_ON = "BEEP:STAT ON"
-    BEEP_OFF = "BEEP:STAT OFF"
-
-    # Auto Range and Range Settings
-    AUTO = "AUTO"
-    AUTO_QUERY = "AUTO?"
-    RANGE_SET = "RANGE"
-    RANGE_QUERY = "RANGE?"
-
-    # Measurement Speed
-    RATE = "RATE"
-    RATE_QUERY = "RATE?"
-    
-    # Continuity
-    CONTINUITY_THRESHOLD = "CONT:THRE"
-    
-    # Math Functions
-    CALC_FUNC = "CALC:FUNC"
-    CALC_FUNC_QUERY = "CALC:FUNC?"
-    CALC_DB_REF = "CALC:DB:REF"
-    CALC_DB_REF_QUERY = "CALC:DB:REF?"
-    CALC_DBM_REF = "CALC:DBM:REF"
-    CALC_DBM_REF_QUERY = "CALC:DBM:REF?"
-    CALC_AVERAGE_QUERY = "CALC:AVER:AVER?"
-    CALC_MIN_QUERY = "CALC:AVER:MIN?"
-    CALC_MAX_QUERY = "CALC:AVER:MAX?"
-    CALC_OFF = "CALC:STAT OFF"
-
-    # Reset (Not functional)
-    RESET = "*RST"
+# Share the command registry of the drivers in the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from OwenCommands import SCPICommand, encode
 
 class SCPI:
     """
@@ -135,8 +60,7 @@ class SCPI:
         """
         Send a SCPI command. If `getdata` is True, waits for a response.
         """
-        msg = msg + '\n'
-        self._SIF.write(msg.encode('ascii'))
+        self._SIF.write(encode(msg))
         if getdata:
             return self.readdata()
         return None
@@ -175,20 +99,21 @@ def measure_voltage_current(device, duration, interval):
 
 def measure_a_voltage_and_current(device):
     """
-    Measure voltage and current for the specified duration and interval.
+    Measure voltage and current once.
+    Returns (nan, nan) if the measurement failed, so callers see a gap.
     """
     try:
         # Measure voltage
-        device.sendcmd("CONF:VOLT:DC AUTO")
-        device.sendcmd(SCPICommand.CONFIG_VOLT_DC_AUTO.value)
+        device.sendcmd(SCPICommand.CONF_VOLT_DC_AUTO.value, getdata=False)
         voltage = float(device.sendcmd(SCPICommand.MEASURE_VOLT.value).replace('V', ''))
         voltage = float(device.sendcmd(SCPICommand.MEASURE_VOLT.value).replace('V', ''))
         # Measure current
-        device.sendcmd(SCPICommand.CONFIG_CURR_DC_AUTO.value)
+        device.sendcmd(SCPICommand.CONF_CURR_DC_AUTO.value, getdata=False)
         current = float(device.sendcmd(SCPICommand.MEASURE_CURRENT.value).replace('A', ''))
         current = float(device.sendcmd(SCPICommand.MEASURE_CURRENT.value).replace('A', ''))
     except Exception as e:
-            print(f"Error during measurement: {e}")
+        print(f"Error during measurement: {e}")
+        voltage = current = float('nan')
     return voltage,current            
     
 def main():
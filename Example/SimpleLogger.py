@@ -9,12 +9,15 @@ import time
 import OWONSerial
 import argparse
 import sys
-import matplotlib.pyplot as plt
+import os
 import keyboard
 import csv
 import datetime
 
 from OWONSerial import SCPICommand
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from OwenPlot import LivePlot
 # Configuration
 
 XDM1141_ADDRESS = "ASRL3::INSTR"  # Replace with your device's VISA address
@@ -22,20 +25,6 @@ MEASUREMENT_INTERVAL = 1  # Interval between measurements (in seconds)
 TEST_DURATION = 60  # Total test duration (in seconds)
 CHECK_INTERVAL = 0.1       # Check for keypress every 0.1s
 
-def plot_voltage_curve(timestamps, voltages):
-    """Plots the voltage curve over time."""
-    plt.figure(figsize=(10, 6))
-    plt.plot(timestamps, voltages, label="Voltage", color="blue", linewidth=2)
-
-
-    # Add labels, title, and legend
-    plt.xlabel("Time (s)")
-    plt.ylabel("Voltage (V)")
-    plt.title("Voltage vs Time")
-    plt.legend()
-    plt.grid()
-    plt.show()
-
 def SaveToCSV (timestamps, voltages):
     # Generate filename based on current date & time
     current_time = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -66,7 +55,7 @@ def main():
     voltages = []
     
     args = parser.parse_args()
-    start_time = time.time()  # Record the start time
+    start_time = time.perf_counter()  # Record the start time
     try:
         # Initialize SCPI interface
         device = OWONSerial.SCPI(port_dev=args.port, speed=args.baudrate)
@@ -76,34 +65,38 @@ def main():
         idn = device.sendcmd(SCPICommand.IDENTIFY.value)
         device.sendcmd(SCPICommand.CONF_VOLT_DC_AUTO.value)        
         print(f"Device ID: {idn}")
-        print("Press q to stop measurement")
-        measurement=True
-        while measurement:
-            # Perform voltage and current measurements
-            V= float(device.sendcmd(SCPICommand.MEASURE_VOLT.value).replace('V', ''))
-            # Store data
+        print("Press q or close the plot window to stop measurement")
+        plot = LivePlot(channels=(("Voltage", "V", "blue"),), title="Voltage vs Time")
+
+        def acquire(plot):
+            while not plot.stopped:
+                # Perform voltage and current measurements
+                before = time.perf_counter()
+                V= float(device.sendcmd(SCPICommand.MEASURE_VOLT.value).replace('V', ''))
+                # Store data, stamped at the middle of the exchange
+
+                voltages.append(V)
+                elapsed_time = 0.5 * (before + time.perf_counter()) - start_time
+                timestamps.append(elapsed_time)
+                plot.push(elapsed_time, V)
+                print(f"Time: {elapsed_time:.2f}s, {V:.5f} V")
+
+                # Wait for the next measurement interval
+                elapsed_time = 0
+                while elapsed_time < MEASUREMENT_INTERVAL and not plot.stopped:
+                    if keyboard.is_pressed('q'):  # Check if 'q' is pressed
+                        print("Measurement stopped!")
+                        plot.stop()
 
-            voltages.append(V)
-            elapsed_time = time.time() - start_time
-            timestamps.append(elapsed_time)
-            print(f"Time: {elapsed_time:.2f}s, {V:.5f} V")
+                    time.sleep(CHECK_INTERVAL)
+                    elapsed_time += CHECK_INTERVAL
 
-            # Wait for the next measurement interval
-            elapsed_time = 0
-            while elapsed_time < MEASUREMENT_INTERVAL:
-                if keyboard.is_pressed('q'):  # Check if 'q' is pressed
-                    print("Measurement stopped!")
-                    measurement=False  # Exit program immediately (or use `break` if inside another loop)
-        
-                time.sleep(CHECK_INTERVAL)
-                elapsed_time += CHECK_INTERVAL
+        plot.run(acquire)
     except Exception as e:
         print(f"Error: {e}")
     finally:
         del device
-        plot_voltage_curve(timestamps,voltages)
         print("Measurement completed.")
-        # Plot the results
         key = input("Press Enter to continue...")
 
 if __name__ == "__main__":
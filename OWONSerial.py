@@ -14,101 +14,42 @@ from time import sleep
 import time
 
 
-from enum import Enum
+from OwenCommands import SCPICommand, encode, command_text
+from OwenTimeouts import LatencyTracker
 
-class SCPICommand(Enum):
-    # System Commands
-    IDENTIFY = "*IDN?"
-    REMOTE_MODE = "SYST:REM"
-    LOCAL_MODE = "SYST:LOC"
-    
-    # Measurement Commands
-    MEASURE = "MEAS?"
-    MEASURE_VOLT = "MEAS:VOLT?"
-    MEASURE_CURRENT = "MEAS:CURRENT?"
-    
-    MEASURE_1 = "MEAS1?"
-    MEASURE_2 = "MEAS2?"
-    MEASURE_SHOW = "MEAS:SHOW?"
-    MEASURE_1_SHOW = "MEAS1:SHOW?"
-    MEASURE_2_SHOW = "MEAS2:SHOW?"
-
-    # Function Selection
-    FUNCTION = "FUNC?"
-    FUNCTION_1 = "FUNC1?"
-    FUNCTION_2 = "FUNC2?"
-    
-    # Configuration Commands
-    CONF_VOLT_DC_AUTO = "CONF:VOLT:DC AUTO"
-    CONF_VOLT_DC = "CONF:VOLT:DC"
-    CONF_VOLT_AC_AUTO = "CONF:VOLT:AC AUTO"
-    CONF_CURR_DC_AUTO = "CONF:CURR:DC AUTO"
-    CONF_CURR_DC = "CONF:CURR:DC"
-    CONF_CURR_AC_AUTO = "CONF:CURR:AC AUTO"
-    CONF_RES_AUTO = "CONF:RES AUTO"
-    CONF_CAP_AUTO = "CONF:CAP AUTO"
-    CONF_FREQ = "CONF:FREQ"
-    CONF_PER = "CONF:PER"
-    CONF_DIOD = "CONF:DIOD"
-    CONF_CONT = "CONF:CONT"
-    CONF_TEMP_RTD = "CONF:TEMP:RTD"
-
-    # Temperature Settings
-    TEMP_RTD_UNIT_C = "TEMP:RTD:UNIT C"
-    TEMP_RTD_UNIT_F = "TEMP:RTD:UNIT F"
-    TEMP_RTD_UNIT_K = "TEMP:RTD:UNIT K"
-    TEMP_RTD_SHOW_TEMP = "TEMP:RTD:SHOW TEMP"
-    TEMP_RTD_SHOW_MEAS = "TEMP:RTD:SHOW MEAS"
-    TEMP_RTD_SHOW_ALL = "TEMP:RTD:SHOW ALL"
-
-    # Beep Control
-    BEEP_STATUS = "BEEP:STAT?"
-    BEEP_ON = "BEEP:STAT ON"
-    BEEP_OFF = "BEEP:STAT OFF"
-
-    # Auto Range and Range Settings
-    AUTO = "AUTO"
-    AUTO_QUERY = "AUTO?"
-    RANGE_SET = "RANGE"
-    RANGE_QUERY = "RANGE?"
-
-    # Measurement Speed
-    RATE = "RATE"
-    RATE_QUERY = "RATE?"
-    
-    # Continuity
-    CONTINUITY_THRESHOLD = "CONT:THRE"
-    
-    # Math Functions
-    CALC_FUNC = "CALC:FUNC"
-    CALC_FUNC_QUERY = "CALC:FUNC?"
-    CALC_DB_REF = "CALC:DB:REF"
-    CALC_DB_REF_QUERY = "CALC:DB:REF?"
-    CALC_DBM_REF = "CALC:DBM:REF"
-    CALC_DBM_REF_QUERY = "CALC:DBM:REF?"
-    CALC_AVERAGE_QUERY = "CALC:AVER:AVER?"
-    CALC_MIN_QUERY = "CALC:AVER:MIN?"
-    CALC_MAX_QUERY = "CALC:AVER:MAX?"
-    CALC_OFF = "CALC:STAT OFF"
-
-    # Reset (Not functional)
-    RESET = "*RST"
+NAN = float('nan')
 
 class SCPI:
     """
     Serial SCPI interface
     """
     _SIF = None
+    LATE_FACTOR = 4     # Learned deadlines within which a late answer is still expected
 
-    def __init__(self, port_dev=None, speed=9600, timeout=2):
-        self._SIF = serial.Serial(
-            port=port_dev,
-            baudrate=speed,
-            bytesize=8,
-            parity='N',
-            stopbits=1,
-            timeout=timeout
-        )
+    def __init__(self, port_dev=None, speed=9600, timeout=2, transport=None, adaptive=True):
+        """
+        Open `port_dev`, or use `transport` instead: an already open
+        serial-like object such as `OwenSession.ReplayTransport`.
+        With `adaptive`, each query's timeout is learned from observed
+        latency (see `timeouts`); `timeout` is used until then.
+        """
+        if transport is not None:
+            self._SIF = transport
+        else:
+            self._SIF = serial.Serial(
+                port=port_dev,
+                baudrate=speed,
+                bytesize=8,
+                parity='N',
+                stopbits=1,
+                timeout=timeout
+            )
+        self._timeout = timeout
+        self._late_until = None     # A late answer may still arrive until then, see _settle
+        self.last_terminated = True
+        self.last_window = (0.0, 0.0)   # perf_counter before write / after read
+        self.timeouts = LatencyTracker(default=timeout) if adaptive else None
+        self.metrics = None     # OwenMetrics.InstrumentMetrics, see OwenMetrics.attach
 
     def __del__(self):
         try:
@@ -116,79 +57,174 @@ class SCPI:
         except:
             pass
 
+    @property
+    def transport(self):
+        """The underlying serial port (or serial-like object)."""
+        return self._SIF
+
+    @transport.setter
+    def transport(self, value):
+        self._SIF = value
+
     def readdata(self):
         """
         Read a SCPI response terminated by CR LF.
+        Returns as soon as the terminator arrives; `last_terminated` is False
+        if the read timed out before a complete frame was received.
         """
-        buf = bytearray(0)
-        while True:
-            data = self._SIF.read(64)
-            if len(data) > 0:
-                buf.extend(data)
-                if len(buf) >= 2 and buf[-2:] == b'\r\n':
-                    break
-            else:
-                break
+        buf = self._SIF.read_until(b'\r\n')
+        self.last_terminated = buf.endswith(b'\r\n')
         return buf.decode(errors="backslashreplace").strip()
 
     def sendcmd(self, msg, getdata=True):
         """
         Send a SCPI command. If `getdata` is True, waits for a response.
+        `msg` is a SCPICommand, a frame from `SCPICommand.X.build(...)` or
+        a plain command string. The request/response window is kept in
+        `last_window` for timestamping.
+        """
+        frame = encode(msg)
+        if self._late_until is not None:
+            self._settle()
+        query = False
+        if self.timeouts is not None:
+            text = command_text(msg)
+            query = getdata and '?' in text
+            if query:
+                deadline = self.timeouts.timeout(text)
+                if deadline != self._SIF.timeout:
+                    self._SIF.timeout = deadline
+            else:
+                self.timeouts.written(text)
+        start = time.perf_counter()
+        self._SIF.write(frame)
+        reply = self.readdata() if getdata else None
+        end = time.perf_counter()
+        self.last_window = (start, end)
+        if query:
+            if self.last_terminated:
+                self.timeouts.observe(text, end - start)
+            else:
+                self.timeouts.timed_out(text)
+                self._late_until = start + min(deadline * self.LATE_FACTOR, self._timeout)
+        if getdata and self.metrics is not None:
+            self.metrics.exchange(end - start, not self.last_terminated)
+        return reply
+
+    def _settle(self):
+        """
+        Discard the late answer to a query that missed its learned deadline,
+        so it is not read as the reply to the next command. A timed-out query
+        returns at once; only a command sent within LATE_FACTOR deadlines
+        (at most `timeout`) of it waits, until the answer arrives or that
+        window ends.
+        """
+        remaining = self._late_until - time.perf_counter()
+        self._late_until = None
+        if remaining > 0:
+            self._SIF.timeout = remaining
+            self._SIF.read_until(b'\r\n')
+        self._SIF.reset_input_buffer()
+
+    @property
+    def last_timestamp(self):
+        """
+        Time of the last reading on the `time.perf_counter` clock: the
+        midpoint of its request/response window.
+        """
+        return 0.5 * (self.last_window[0] + self.last_window[1])
+
+    def pending(self):
+        """
+        Number of received bytes not yet read. Non-zero after a complete
+        response means the stream is out of step with the commands.
+        """
+        return self._SIF.in_waiting
+
+    def flush(self, settle=0.05):
+        """
+        Discard anything in the input and output buffers, after waiting
+        `settle` seconds for late responses still on the wire.
         """
-        msg = msg + '\n'
-        self._SIF.write(msg.encode('ascii'))
-        if getdata:
-            return self.readdata()
-        return None
+        sleep(settle)
+        self._SIF.reset_input_buffer()
+        self._SIF.reset_output_buffer()
+
+    def reopen(self):
+        """
+        Close and reopen the serial port, e.g. after the USB cable was
+        unplugged and replugged.
+        """
+        try:
+            self._SIF.close()
+        except Exception:
+            pass
+        self._SIF.open()
 
 
 def measure_voltage_current(device, duration, interval):
     """
     Measure voltage and current for the specified duration and interval.
+    Samples are taken on a fixed schedule; a failed or missed sample is
+    printed as a gap (nan) row and the schedule resumes at the next slot.
+    The time printed is that of the readings (see `SCPI.last_timestamp`),
+    midway between the voltage and the current reading.
     """
     print("Starting measurements...")
     print("Time (s), Voltage (V), Current (A)")
 
-    elapsed_time = 0
-    start_time = time.time()
-    while elapsed_time < duration:
+    metrics = getattr(device, "metrics", None)
+    start_time = time.monotonic()
+    t0 = time.perf_counter()    # Origin of the printed reading times
+    slot = 0
+    while slot * interval < duration:
+        # Wait for the next slot on the schedule
+        sleep(max(0, start_time + slot * interval - time.monotonic()))
+        elapsed_time = slot * interval
+        lag = time.monotonic() - start_time - elapsed_time
         try:
             # Measure voltage
-            cycle_start = time.time()
-            device.sendcmd(SCPICommand.CONF_VOLT_DC_AUTO.value)
+            device.sendcmd(SCPICommand.CONF_VOLT_DC_AUTO.value, getdata=False)
             voltage = float(device.sendcmd(SCPICommand.MEASURE_VOLT.value).replace('V', ''))
             voltage = float(device.sendcmd(SCPICommand.MEASURE_VOLT.value).replace('V', ''))
+            voltage_time = device.last_timestamp
             # Measure current
-            device.sendcmd(SCPICommand.CONF_CURR_DC_AUTO.value)
+            device.sendcmd(SCPICommand.CONF_CURR_DC_AUTO.value, getdata=False)
             current = float(device.sendcmd(SCPICommand.MEASURE_CURRENT.value).replace('A', ''))
             current = float(device.sendcmd(SCPICommand.MEASURE_CURRENT.value).replace('A', ''))
-            print(f"{elapsed_time:6.1f}, {voltage:9.5f}, {current:9.5f}")
+            reading_time = 0.5 * (voltage_time + device.last_timestamp) - t0
+            print(f"{reading_time:8.3f}, {voltage:9.5f}, {current:9.5f}")
+            if metrics is not None:
+                metrics.sample(lag)
 
         except Exception as e:
-            print(f"Error during measurement: {e}")
-        cycle_time = time.time() - cycle_start
-        sleep_time = max(0, interval - cycle_time)
-        sleep(sleep_time)
-        elapsed_time += interval
+            print(f"{elapsed_time:8.3f}, {NAN:9.5f}, {NAN:9.5f}  # gap: {e}")
+
+        # Skip slots that were missed while the device was recovering
+        next_slot = int((time.monotonic() - start_time) / interval) + 1
+        if next_slot > slot + 1:
+            print(f"# gap: {next_slot - slot - 1} sample(s) missed")
+        slot = max(slot + 1, next_slot)
 
     print("Measurements completed.")
 
 def measure_a_voltage_and_current(device):
     """
-    Measure voltage and current for the specified duration and interval.
+    Measure voltage and current once.
+    Returns (nan, nan) if the measurement failed, so callers see a gap.
     """
     try:
         # Measure voltage
-        device.sendcmd("CONF:VOLT:DC AUTO")
-        device.sendcmd(SCPICommand.CONFIG_VOLT_DC_AUTO.value)
+        device.sendcmd(SCPICommand.CONF_VOLT_DC_AUTO.value, getdata=False)
         voltage = float(device.sendcmd(SCPICommand.MEASURE_VOLT.value).replace('V', ''))
         voltage = float(device.sendcmd(SCPICommand.MEASURE_VOLT.value).replace('V', ''))
         # Measure current
-        device.sendcmd(SCPICommand.CONFIG_CURR_DC_AUTO.value)
+        device.sendcmd(SCPICommand.CONF_CURR_DC_AUTO.value, getdata=False)
         current = float(device.sendcmd(SCPICommand.MEASURE_CURRENT.value).replace('A', ''))
         current = float(device.sendcmd(SCPICommand.MEASURE_CURRENT.value).replace('A', ''))
     except Exception as e:
-            print(f"Error during measurement: {e}")
+        print(f"Error during measurement: {e}")
+        voltage = current = NAN
     return voltage,current            
     
 def main():
@@ -198,17 +234,24 @@ def main():
     parser.add_argument('--baudrate', type=int, default=115200, help='Baud rate for communication (default: 115200)')
     parser.add_argument('--duration', type=int, default=7200, help='Duration of the measurement in seconds (default: 60)')
     parser.add_argument('--interval', type=float, default=60.0, help='Interval between measurements in seconds (default: 1.0)')
+    parser.add_argument('--metrics-port', type=int, default=0, help='Serve Prometheus metrics on this local port (default: off)')
 
     args = parser.parse_args()
 
+    device = None
     try:
-        # Initialize SCPI interface
-        device = SCPI(port_dev=args.port, speed=args.baudrate)
+        # Initialize SCPI interface, with recovery from desync and unplug
+        from OwenRecovery import RecoveringSCPI
+        device = RecoveringSCPI(SCPI(port_dev=args.port, speed=args.baudrate))
         print(f"Connected to device on port {args.port}")
+        if args.metrics_port:
+            import OwenMetrics
+            OwenMetrics.attach(device, args.port)
+            OwenMetrics.MetricsServer(port=args.metrics_port)
+            print(f"Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
 
         # Query device identification
-        idn = device.sendcmd(SCPICommand.IDENTIFY.value)
-        print(f"Device ID: {idn}")
+        print(f"Device ID: {device.idn}")
 
         # Perform voltage and current measurements
         measure_voltage_current(device, args.duration, args.interval)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+# MIT License
+
+# Time alignment of several meters logging the same circuit.
+#
+# A reading is stamped at the midpoint of its request/response window on the
+# monotonic `time.perf_counter` clock, with half the window as its timing
+# uncertainty. align() resamples any number of such streams onto one shared
+# timebase by linear interpolation and returns a per-sample uncertainty
+# bound, so e.g. power from a voltage meter and a current meter can be
+# computed at rates where the serial latency would otherwise dominate.
+
+import argparse
+import collections
+
+import numpy as np
+
+import OWONSerial
+from OwenCommands import SCPICommand, parse_reading
+
+
+TimedReading = collections.namedtuple("TimedReading", ["time", "value", "uncertainty"])
+TimedReading.__doc__ = """
+A reading stamped at the midpoint of its request/response window
+(time.perf_counter seconds); `uncertainty` is half the window.
+"""
+
+Aligned = collections.namedtuple("Aligned", ["time", "values", "uncertainty"])
+Aligned.__doc__ = """
+Streams resampled onto one timebase. `values` and `uncertainty` have one
+row per stream; `uncertainty` bounds the value error caused by timing.
+"""
+
+
+def timed_query(device, cmd, parse=parse_reading):
+    """
+    Query `device` (anything with `sendcmd` and `last_window`, e.g.
+    OWONSerial.SCPI) and return a TimedReading.
+    """
+    reply = device.sendcmd(cmd)
+    start, end = device.last_window
+    return TimedReading(0.5 * (start + end), parse(reply), 0.5 * (end - start))
+
+
+def _as_arrays(stream):
+    data = np.asarray(stream, dtype=float).reshape(-1, 3)
+    good = ~np.isnan(data[:, 1])
+    return data[good, 0], data[good, 1], data[good, 2]
+
+
+def align(streams, timebase=None, step=None):
+    """
+    Resample `streams` (each a sequence of TimedReading, sorted by time) onto
+    a shared timebase.
+
+    If `timebase` is None, it spans the interval covered by all streams with
+    spacing `step` (default: the median spacing of the slowest stream).
+
+    The uncertainty of each resampled value is |slope| x timing uncertainty,
+    where the slope is that of the bracketing sample pair and the timing
+    uncertainty is interpolated from the bracketing half-windows. Raises
+    ValueError if a stream has fewer than two valid readings.
+    """
+    arrays = [_as_arrays(s) for s in streams]
+    for row, (t, _, _) in enumerate(arrays):
+        if len(t) < 2:
+            raise ValueError(f"Stream {row} has {len(t)} valid reading(s), at least 2 are needed")
+    if timebase is None:
+        start = max(t[0] for t, _, _ in arrays)
+        stop = min(t[-1] for t, _, _ in arrays)
+        if step is None:
+            step = max(np.median(np.diff(t)) for t, _, _ in arrays)
+        timebase = np.arange(start, stop + 0.5 * step, step)
+    timebase = np.asarray(timebase, dtype=float)
+
+    values = np.empty((len(arrays), len(timebase)))
+    uncertainty = np.empty_like(values)
+    for row, (t, v, u) in enumerate(arrays):
+        values[row] = np.interp(timebase, t, v)
+        slope = np.diff(v) / np.diff(t)
+        index = np.clip(np.searchsorted(t, timebase) - 1, 0, len(slope) - 1)
+        uncertainty[row] = np.abs(slope[index]) * np.interp(timebase, t, u)
+    return Aligned(timebase, values, uncertainty)
+
+
+def aligned_power(voltages, currents, step=None):
+    """
+    Power from a voltage stream and a current stream taken by two meters.
+    Returns (time, power, uncertainty).
+    """
+    aligned = align([voltages, currents], step=step)
+    v, i = aligned.values
+    u_v, u_i = aligned.uncertainty
+    return aligned.time, v * i, np.abs(i) * u_v + np.abs(v) * u_i
+
+
+def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Power from two XDM1041, one on voltage and one on current.")
+    parser.add_argument('--vport', default='COM3', help='Serial port of the voltage meter')
+    parser.add_argument('--iport', default='COM4', help='Serial port of the current meter')
+    parser.add_argument('--baudrate', type=int, default=115200, help='Baud rate for communication (default: 115200)')
+    parser.add_argument('--samples', type=int, default=100, help='Number of readings per meter (default: 100)')
+
+    args = parser.parse_args()
+
+    vmeter = imeter = None
+    try:
+        vmeter = OWONSerial.SCPI(port_dev=args.vport, speed=args.baudrate)
+        imeter = OWONSerial.SCPI(port_dev=args.iport, speed=args.baudrate)
+        vmeter.sendcmd(SCPICommand.CONF_VOLT_DC_AUTO, getdata=False)
+        imeter.sendcmd(SCPICommand.CONF_CURR_DC_AUTO, getdata=False)
+
+        voltages = []
+        currents = []
+        for _ in range(args.samples):
+            voltages.append(timed_query(vmeter, SCPICommand.MEASURE))
+            currents.append(timed_query(imeter, SCPICommand.MEASURE))
+
+        t, p, u = aligned_power(voltages, currents)
+        t0 = t[0]
+        print("Time (s), Power (W), Uncertainty (W)")
+        for ts, ps, us in zip(t, p, u):
+            print(f"{ts - t0:8.3f}, {ps:9.5f}, {us:9.5f}")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        del vmeter, imeter
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+# The one SCPI command registry shared by all drivers.
+#
+# Every command is a `Command`: a str (so `SCPICommand.X.value` still reads
+# and concatenates like the plain strings it replaces) that also knows its
+# parameters, response type and unit. The wire frame of a fixed command is
+# encoded once when this module is imported; parameterized commands are
+# validated and encoded by `build()` and the frame is cached per argument
+# tuple. A bad range or unit therefore raises ValueError before anything is
+# sent, instead of showing up as a device timeout.
+
+import functools
+import re
+from enum import Enum
+
+
+class VoltageRange(Enum):
+    """Valid voltage ranges for DC and AC modes"""
+    MIN = "50E-3"   # 50mV
+    LOW = "500E-3"  # 500mV
+    MID = "5"       # 5V
+    HIGH = "50"     # 50V
+    MAX = "1000"    # 1000V
+
+class CurrentRange(Enum):
+    """Valid current ranges for DC and AC modes"""
+    MIN = "500E-6"  # 500µA
+    LOW = "5E-3"    # 5mA
+    MID = "500E-3"  # 500mA
+    HIGH = "5"      # 5A
+    MAX = "10"      # 10A
+
+class TemperatureUnit(Enum):
+    """Temperature units"""
+    CELSIUS = "C"
+    FAHRENHEIT = "F"
+    KELVIN = "K"
+
+class MeasurementSpeed(Enum):
+    """Measurement speed settings"""
+    SLOW = "S"
+    MEDIUM = "M"
+    FAST = "F"
+
+
+# A measurement answer: a number, optionally followed by a unit
+_READING = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*[a-zA-Zµ%]*\s*$")
+
+
+def parse_reading(reply):
+    """Return the number in a measurement answer like '1.2345E+00V'."""
+    match = _READING.match(reply)
+    if match is None:
+        raise ValueError(f"Garbled reading: '{reply}'")
+    return float(match.group(1))
+
+
+class Choice:
+    """Parameter that must be one of a fixed set of values (or Enum members)."""
+
+    def __init__(self, *choices):
+        self.choices = {}
+        for choice in choices:
+            members = list(choice) if isinstance(choice, type) and issubclass(choice, Enum) else [choice]
+            for member in members:
+                text = member.value if isinstance(member, Enum) else str(member)
+                self.choices[text.upper()] = text
+
+    def format(self, arg):
+        text = arg.value if isinstance(arg, Enum) else str(arg)
+        try:
+            return self.choices[text.upper()]
+        except KeyError:
+            raise ValueError(f"'{text}' is not one of {', '.join(self.choices.values())}") from None
+
+
+class Number:
+    """Numeric parameter with optional inclusive bounds."""
+
+    def __init__(self, low=None, high=None):
+        self.low = low
+        self.high = high
+
+    def format(self, arg):
+        value = float(arg.value if isinstance(arg, Enum) else arg)
+        if (self.low is not None and value < self.low) or (self.high is not None and value > self.high):
+            raise ValueError(f"{value:g} is outside [{self.low}, {self.high}]")
+        return f"{value:.12g}"
+
+
+class Command(str):
+    """
+    A SCPI command. The str value is the command text (without parameters).
+
+    `response` is the type of the answer (float, str) or None for commands
+    without a response; `unit` is the unit of a float answer.
+    """
+
+    _CACHE_SIZE = 256
+
+    def __new__(cls, text, response=None, unit=None, params=()):
+        self = super().__new__(cls, text)
+        self.response = response
+        self.unit = unit
+        self.params = tuple(params)
+        # Fixed commands are encoded once, here
+        self.frame = None if self.params else (text + "\n").encode("ascii")
+        self._frames = {}
+        return self
+
+    @property
+    def is_query(self):
+        return self.response is not None
+
+    def build(self, *args):
+        """Return the validated wire frame for this command with `args`."""
+        if not self.params:
+            if args:
+                raise ValueError(f"{self} takes no parameters")
+            return self.frame
+        frame = self._frames.get(args)
+        if frame is None:
+            if len(args) != len(self.params):
+                raise ValueError(f"{self} takes {len(self.params)} parameter(s), got {len(args)}")
+            text = " ".join(p.format(a) for p, a in zip(self.params, args))
+            frame = f"{self} {text}\n".encode("ascii")
+            if len(self._frames) >= self._CACHE_SIZE:
+                self._frames.clear()
+            self._frames[args] = frame
+        return frame
+
+    def parse(self, reply):
+        """Convert a response to the command's response type."""
+        if self.response is float:
+            return parse_reading(reply)
+        return reply
+
+
+class SCPICommand(Enum):
+    # System Commands
+    IDENTIFY = Command("*IDN?", str)                # Query device identification (manufacturer, model, serial number, firmware version)
+    REMOTE_MODE = Command("SYST:REM")               # Set device to remote control mode
+    LOCAL_MODE = Command("SYST:LOC")                # Return device to local (manual) control mode
+
+    # Measurement Commands
+    MEASURE = Command("MEAS?", float)               # Query the latest measurement (depends on the current function mode)
+    MEASURE_VOLT = Command("MEAS:VOLT?", float, "V")
+    MEASURE_CURRENT = Command("MEAS:CURRENT?", float, "A")
+
+    MEASURE_1 = Command("MEAS1?", float)
+    MEASURE_2 = Command("MEAS2?", float)
+    MEASURE_SHOW = Command("MEAS:SHOW?", str)
+    MEASURE_1_SHOW = Command("MEAS1:SHOW?", str)
+    MEASURE_2_SHOW = Command("MEAS2:SHOW?", str)
+
+    # Function Selection
+    FUNCTION = Command("FUNC?", str)
+    FUNCTION_1 = Command("FUNC1?", str)
+    FUNCTION_2 = Command("FUNC2?", str)
+
+    # Configuration Commands
+    CONF_VOLT_DC_AUTO = Command("CONF:VOLT:DC AUTO")
+    CONF_VOLT_DC = Command("CONF:VOLT:DC", params=[Choice(VoltageRange, "AUTO")])
+    CONF_VOLT_AC_AUTO = Command("CONF:VOLT:AC AUTO")
+    CONF_VOLT_AC = Command("CONF:VOLT:AC", params=[Choice(VoltageRange, "AUTO")])
+    CONF_CURR_DC_AUTO = Command("CONF:CURR:DC AUTO")
+    CONF_CURR_DC = Command("CONF:CURR:DC", params=[Choice(CurrentRange, "AUTO")])
+    CONF_CURR_AC_AUTO = Command("CONF:CURR:AC AUTO")
+    CONF_CURR_AC = Command("CONF:CURR:AC", params=[Choice(CurrentRange, "AUTO")])
+    CONF_RES_AUTO = Command("CONF:RES AUTO")
+    CONF_CAP_AUTO = Command("CONF:CAP AUTO")
+    CONF_FREQ = Command("CONF:FREQ")
+    CONF_PER = Command("CONF:PER")
+    CONF_DIOD = Command("CONF:DIOD")
+    CONF_CONT = Command("CONF:CONT")
+    CONF_TEMP_RTD = Command("CONF:TEMP:RTD")
+
+    # Temperature Settings
+    TEMP_RTD_UNIT = Command("TEMP:RTD:UNIT", params=[Choice(TemperatureUnit)])
+    TEMP_RTD_UNIT_C = Command("TEMP:RTD:UNIT C")
+    TEMP_RTD_UNIT_F = Command("TEMP:RTD:UNIT F")
+    TEMP_RTD_UNIT_K = Command("TEMP:RTD:UNIT K")
+    TEMP_RTD_UNIT_QUERY = Command("TEMP:RTD:UNIT?", str)
+    TEMP_RTD_SHOW_TEMP = Command("TEMP:RTD:SHOW TEMP")
+    TEMP_RTD_SHOW_MEAS = Command("TEMP:RTD:SHOW MEAS")
+    TEMP_RTD_SHOW_ALL = Command("TEMP:RTD:SHOW ALL")
+
+    # Beep Control
+    BEEP_STATUS = Command("BEEP:STAT?", str)        # Not supported, the device reports an error
+    BEEP_ON = Command("BEEP:STAT ON")               # Enable device beep sound
+    BEEP_OFF = Command("BEEP:STAT OFF")             # Disable device beep sound
+
+    # Auto Range and Range Settings
+    AUTO = Command("AUTO")
+    AUTO_QUERY = Command("AUTO?", str)
+    RANGE_SET = Command("RANGE", params=[Number(0)])
+    RANGE_QUERY = Command("RANGE?", str)
+
+    # Measurement Speed
+    RATE = Command("RATE", params=[Choice(MeasurementSpeed)])
+    RATE_QUERY = Command("RATE?", str)
+
+    # Continuity
+    CONTINUITY_THRESHOLD = Command("CONT:THRE", params=[Number(0)])
+
+    # Math Functions
+    CALC_FUNC = Command("CALC:FUNC", params=[Choice("NULL", "DB", "DBM", "AVERage", "AVER")])
+    CALC_FUNC_QUERY = Command("CALC:FUNC?", str)
+    CALC_DB_REF = Command("CALC:DB:REF", params=[Number()])
+    CALC_DB_REF_QUERY = Command("CALC:DB:REF?", float)
+    CALC_DBM_REF = Command("CALC:DBM:REF", params=[Number(0)])
+    CALC_DBM_REF_QUERY = Command("CALC:DBM:REF?", float)
+    CALC_AVERAGE_QUERY = Command("CALC:AVER:AVER?", float)
+    CALC_MIN_QUERY = Command("CALC:AVER:MIN?", float)
+    CALC_MAX_QUERY = Command("CALC:AVER:MAX?", float)
+    CALC_OFF = Command("CALC:STAT OFF")
+
+    # Reset (Not functional)
+    RESET = Command("*RST")                         # Reset the device to factory default settings
+
+    def build(self, *args):
+        return self.value.build(*args)
+
+    def parse(self, reply):
+        return self.value.parse(reply)
+
+
+# Pre-encoded wire frame on each member (None for commands that need
+# parameters), so the send path is a single attribute lookup
+for _member in SCPICommand:
+    _member.frame = _member.value.frame
+del _member
+
+
+@functools.lru_cache(maxsize=256)
+def _encode_text(text):
+    return (text + "\n").encode("ascii")
+
+
+def encode(msg):
+    """
+    Return the wire frame for `msg`: a SCPICommand member, a Command, an
+    already built bytes frame, or a plain command string. Raises ValueError
+    for a command that takes parameters; use its `build()` instead.
+    """
+    frame = getattr(msg, "frame", None)
+    if frame is not None:
+        return frame
+    if isinstance(msg, bytes):
+        return msg
+    if isinstance(msg, SCPICommand):
+        msg = msg.value
+    if isinstance(msg, Command) and msg.params:
+        raise ValueError(f"{msg} takes {len(msg.params)} parameter(s), use build()")
+    return _encode_text(str(msg))
+
+
+def command_text(msg):
+    """Return the command text of anything `encode` accepts."""
+    if isinstance(msg, SCPICommand):
+        return str(msg.value)
+    if isinstance(msg, bytes):
+        return msg.decode("ascii").strip()
+    return str(msg)
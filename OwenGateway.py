@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+# MIT License
+
+# Shared-access gateway for a single XDM1041.
+#
+# Only one process can own the serial port, so the gateway owns it and serves
+# any number of local clients over a TCP socket on 127.0.0.1. Every device
+# access is serialized, identical concurrent queries are coalesced into one
+# round trip, and query answers younger than `ttl` are served from cache.
+#
+# Wire protocol (one line per request, one line per reply):
+#     client -> "MEAS?\n"
+#     gateway -> "OK 1.2345E+00\n"   or   "ERR <message>\n"
+
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+import OWONSerial
+from OwenCommands import SCPICommand, command_text
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5025        # Conventional SCPI raw socket port
+DEFAULT_TTL = 0.5          # Seconds a query answer may be served from cache
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _Pending:
+    """A device query in flight that other clients can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SCPIGateway:
+    """
+    Owns one SCPI device and shares it between many local clients.
+
+    `device` is either an `OWONSerial.SCPI` (sendcmd) or an
+    `OwenScpi.SCPIInstrument` (query / send_command).
+    """
+
+    def __init__(self, device, host=DEFAULT_HOST, port=DEFAULT_PORT, ttl=DEFAULT_TTL):
+        self.device = device
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self._io_lock = threading.Lock()      # Serializes access to the device
+        self._state_lock = threading.Lock()   # Guards cache / in-flight tables
+        self._cache = {}                      # command -> (monotonic stamp, answer)
+        self._inflight = {}                   # command -> _Pending
+        self._generation = 0                  # Bumped by every write
+        self._server = None
+        self._thread = None
+        self.device_queries = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    def _device_call(self, cmd, getdata):
+        with self._io_lock:
+            if hasattr(self.device, "sendcmd"):
+                reply = self.device.sendcmd(cmd, getdata=getdata)
+                # A timed-out answer must be neither cached nor fanned out
+                if getdata and not getattr(self.device, "last_terminated", True):
+                    raise IOError(f"Timeout waiting for reply to '{cmd}'")
+                return reply
+            if getdata:
+                return self.device.query(cmd)
+            self.device.send_command(cmd)
+            return None
+
+    def _invalidate(self):
+        with self._state_lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def execute(self, cmd):
+        """
+        Run one command on behalf of a client and return the answer
+        ('' for commands without a response).
+        """
+        cmd = cmd.strip()
+        if "?" not in cmd:
+            # Any setting change makes cached answers stale
+            self._invalidate()
+            try:
+                self._device_call(cmd, False)
+            finally:
+                # A query that got the device before this write may have
+                # cached an answer from the old settings in the meantime
+                self._invalidate()
+            return ""
+
+        with self._state_lock:
+            entry = self._cache.get(cmd)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self.cache_hits += 1
+                return entry[1]
+            pending = self._inflight.get(cmd)
+            leader = pending is None
+            if leader:
+                pending = _Pending()
+                self._inflight[cmd] = pending
+                generation = self._generation
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = self._device_call(cmd, True)
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._state_lock:
+                del self._inflight[cmd]
+                self.device_queries += 1
+                if pending.error is None and generation == self._generation:
+                    self._cache[cmd] = (time.monotonic(), pending.result)
+            pending.event.set()
+        return pending.result
+
+    def stats(self):
+        """Return counters describing how much load the gateway saved."""
+        with self._state_lock:
+            return {
+                "device_queries": self.device_queries,
+                "cache_hits": self.cache_hits,
+                "coalesced": self.coalesced,
+            }
+
+    def start(self):
+        """Start serving clients on a background thread."""
+        gateway = self
+        metrics = getattr(self.device, "metrics", None)
+        if metrics is not None:
+            metrics.gauge("gateway_inflight", lambda: len(self._inflight))
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    cmd = line.decode("ascii", errors="replace").strip()
+                    if not cmd:
+                        continue
+                    try:
+                        reply = "OK " + (gateway.execute(cmd) or "")
+                    except Exception as e:
+                        reply = f"ERR {e}"
+                    self.wfile.write(reply.replace("\n", " ").encode("ascii", errors="replace") + b"\n")
+
+        self._server = _Server((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Stop serving clients. The device itself is left open."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class GatewayClient:
+    """
+    Client side of the gateway with the same `sendcmd` interface as
+    `OWONSerial.SCPI`, so it can be passed to the existing measurement loops.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=10):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._sock.makefile("rwb")
+
+    def __del__(self):
+        self.close()
+
+    def sendcmd(self, msg, getdata=True):
+        """
+        Send a SCPI command through the gateway. If `getdata` is True,
+        returns the response. A batched frame with several commands is sent
+        as one request per line; the response is that of the last line.
+        """
+        lines = [line.strip() for line in command_text(msg).splitlines() if line.strip()]
+        self._file.write("".join(line + "\n" for line in lines).encode("ascii"))
+        self._file.flush()
+        # One reply per line, all read even after an error to stay in step
+        error = reply = None
+        for _ in lines:
+            reply = self._file.readline().decode("ascii", errors="backslashreplace").rstrip("\r\n")
+            if not reply:
+                raise ConnectionError("Gateway closed the connection")
+            if reply.startswith("ERR") and error is None:
+                error = reply[4:]
+        if error is not None:
+            raise IOError(error)
+        if getdata and reply is not None:
+            return reply[3:]
+        return None
+
+    def close(self):
+        try:
+            self._file.close()
+            self._sock.close()
+        except Exception:
+            pass
+
+
+def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Shared-access SCPI gateway for XDM1041.")
+    parser.add_argument('--port', default='COM3', help='Serial port for the XDM1041 (e.g., COM3 or /dev/ttyUSB0)')
+    parser.add_argument('--baudrate', type=int, default=115200, help='Baud rate for communication (default: 115200)')
+    parser.add_argument('--listen', type=int, default=DEFAULT_PORT, help=f'Local TCP port to serve clients on (default: {DEFAULT_PORT})')
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL, help=f'Max age in seconds of cached query answers (default: {DEFAULT_TTL})')
+    parser.add_argument('--metrics-port', type=int, default=0, help='Serve Prometheus metrics on this local port (default: off)')
+
+    args = parser.parse_args()
+
+    device = None
+    try:
+        device = OWONSerial.SCPI(port_dev=args.port, speed=args.baudrate)
+        print(f"Connected to device on port {args.port}")
+        print(f"Device ID: {device.sendcmd(SCPICommand.IDENTIFY.value)}")
+        if args.metrics_port:
+            # Attach before start() so the in-flight queue is reported too
+            import OwenMetrics
+            OwenMetrics.attach(device, args.port)
+            OwenMetrics.MetricsServer(port=args.metrics_port)
+            print(f"Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+
+        gateway = SCPIGateway(device, port=args.listen, ttl=args.ttl)
+        gateway.start()
+        print(f"Serving on {gateway.host}:{gateway.port} (Ctrl+C to stop)")
+        while True:
+            time.sleep(10)
+            print(f"Stats: {gateway.stats()}")
+    except KeyboardInterrupt:
+        print("Stopping gateway.")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        del device
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+# MIT License
+
+# Charge / energy integration for battery tests.
+#
+# EnergyIntegrator is fed one (t, V, I) sample at a time and keeps only the
+# running totals, so Ah, Wh, power and internal resistance update live with
+# constant memory. integrate() does the same on whole arrays with NumPy, for
+# reprocessing stored logs.
+#
+# Both use the trapezoidal rule on the real sample timestamps, so irregular
+# intervals (retries, gaps) are integrated correctly. Samples with nan (gaps)
+# are skipped and the integral is bridged linearly to the next good sample.
+
+import argparse
+import math
+
+import numpy as np
+
+
+class EnergyIntegrator:
+    """
+    Online integrator of charge, energy and internal resistance.
+
+    Internal resistance is estimated as |dV/dI| between consecutive samples
+    whose current differs by at least `min_delta_current` (a load step),
+    smoothed with an exponential moving average of weight `alpha`.
+    """
+
+    def __init__(self, min_delta_current=0.01, alpha=0.2):
+        self.min_delta_current = min_delta_current
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.charge = 0.0           # Coulomb (A*s)
+        self.energy = 0.0           # Joule (W*s)
+        self.power = math.nan       # Last instantaneous power (W)
+        self.resistance = math.nan  # Smoothed internal resistance (Ohm)
+        self.samples = 0
+        self._prev = None
+
+    @property
+    def amp_hours(self):
+        return self.charge / 3600.0
+
+    @property
+    def watt_hours(self):
+        return self.energy / 3600.0
+
+    def update(self, t, voltage, current):
+        """Add one sample taken at time `t` (seconds)."""
+        if math.isnan(voltage) or math.isnan(current):
+            return
+        power = voltage * current
+        if self._prev is not None:
+            prev_t, prev_v, prev_i, prev_p = self._prev
+            dt = t - prev_t
+            if dt > 0:
+                self.charge += 0.5 * (current + prev_i) * dt
+                self.energy += 0.5 * (power + prev_p) * dt
+            delta_i = current - prev_i
+            if abs(delta_i) >= self.min_delta_current:
+                estimate = abs((voltage - prev_v) / delta_i)
+                if math.isnan(self.resistance):
+                    self.resistance = estimate
+                else:
+                    self.resistance += self.alpha * (estimate - self.resistance)
+        self.power = power
+        self.samples += 1
+        self._prev = (t, voltage, current, power)
+
+    def summary(self):
+        return {
+            "amp_hours": self.amp_hours,
+            "watt_hours": self.watt_hours,
+            "power": self.power,
+            "resistance": self.resistance,
+            "samples": self.samples,
+        }
+
+    def __str__(self):
+        return (f"{self.amp_hours:.5f} Ah, {self.watt_hours:.5f} Wh, "
+                f"{self.power:.4f} W, R={self.resistance * 1000:.1f} mOhm")
+
+
+def integrate(t, voltage, current, min_delta_current=0.01):
+    """
+    Vectorized version of EnergyIntegrator for whole logs.
+
+    Returns a dict of arrays aligned with the good (non-nan) samples:
+    'time', 'power' (W), 'amp_hours' and 'watt_hours' (cumulative), and
+    'resistance' (per-step |dV/dI| estimate in Ohm, nan where the current
+    step is below `min_delta_current`).
+    """
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(voltage, dtype=float)
+    i = np.asarray(current, dtype=float)
+    good = ~(np.isnan(v) | np.isnan(i))
+    t, v, i = t[good], v[good], i[good]
+
+    p = v * i
+    dt = np.clip(np.diff(t), 0, None)
+    # [:len(t)] keeps the arrays aligned when there are no good samples
+    charge = np.concatenate(([0.0], np.cumsum(0.5 * (i[1:] + i[:-1]) * dt)))[:len(t)]
+    energy = np.concatenate(([0.0], np.cumsum(0.5 * (p[1:] + p[:-1]) * dt)))[:len(t)]
+
+    delta_i = np.diff(i)
+    step = np.abs(delta_i) >= min_delta_current
+    resistance = np.full(len(t), np.nan)
+    resistance[1:][step] = np.abs(np.diff(v)[step] / delta_i[step])
+
+    return {
+        "time": t,
+        "power": p,
+        "amp_hours": charge / 3600.0,
+        "watt_hours": energy / 3600.0,
+        "resistance": resistance,
+    }
+
+
+def integrate_file(filename, min_delta_current=0.01):
+    """
+    Reprocess a stored CSV log with columns Time (s), Voltage (V),
+    Current (A) and a header line, as written by Example/ChargeLogger.py.
+    """
+    # reshape: genfromtxt returns 1-D for a single row and for an empty log
+    data = np.genfromtxt(filename, delimiter=",", skip_header=1, usecols=(0, 1, 2)).reshape(-1, 3)
+    return integrate(data[:, 0], data[:, 1], data[:, 2], min_delta_current)
+
+
+def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Charge and energy of a stored voltage/current log.")
+    parser.add_argument('filename', help='CSV log with columns time (s), voltage (V), current (A)')
+    parser.add_argument('--min-delta-current', type=float, default=0.01, help='Smallest current step used for resistance estimates in A (default: 0.01)')
+
+    args = parser.parse_args()
+
+    result = integrate_file(args.filename, args.min_delta_current)
+    print(f"Samples:    {len(result['time'])}")
+    if not len(result['time']):
+        print("No valid readings in the log.")
+        return
+    print(f"Charge:     {result['amp_hours'][-1]:.5f} Ah")
+    print(f"Energy:     {result['watt_hours'][-1]:.5f} Wh")
+    print(f"Resistance: {np.nanmedian(result['resistance']) * 1000:.1f} mOhm (median)")
+
+
+if __name__ == "__main__":
+    main()
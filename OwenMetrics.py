@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+# MIT License
+
+# Acquisition health metrics.
+#
+# Each instrument gets an InstrumentMetrics that the drivers and loops feed
+# with O(1) appends and counter increments only: exchanges (latency,
+# timeouts), samples (schedule lag) and reconnects. Rates and percentiles
+# are computed when a snapshot is taken, so the sampling path never pays for
+# them. A MetricsServer serves all instruments as Prometheus text on a local
+# HTTP port; `snapshot()` gives the same numbers in-process.
+
+import collections
+import http.server
+import threading
+import time
+
+
+class InstrumentMetrics:
+    """Raw measurements for one instrument. Attach with `attach()`."""
+
+    def __init__(self, name, window=1024):
+        self.name = name
+        self.samples = 0
+        self.exchanges = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self._sample_times = collections.deque(maxlen=window)
+        self._lags = collections.deque(maxlen=window)
+        self._latencies = collections.deque(maxlen=window)
+        self._gauges = {}
+
+    # Called from the acquisition path: appends and increments only
+
+    def exchange(self, latency, timed_out=False):
+        """One query round trip (seconds); `timed_out` if no answer came."""
+        self.exchanges += 1
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self._latencies.append(latency)
+
+    def sample(self, lag=0.0):
+        """One sample acquired, `lag` seconds behind its scheduled time."""
+        self.samples += 1
+        self._sample_times.append(time.monotonic())
+        self._lags.append(lag)
+
+    def reconnect(self):
+        self.reconnects += 1
+
+    def gauge(self, name, read):
+        """Report `read()` as queue depth `name` in every snapshot."""
+        self._gauges[name] = read
+
+    # Called from the reporting side
+
+    def snapshot(self):
+        """
+        Return a dict with the current health of this instrument. The sample
+        rate is taken over the retained samples (the last `window`), so it
+        is right for slow loggers too.
+        """
+        times = list(self._sample_times)
+        span = times[-1] - times[0] if times else 0.0
+        lags = list(self._lags)
+        return {
+            "samples": self.samples,
+            "samples_per_sec": (len(times) - 1) / span if span > 0 else 0.0,
+            "schedule_lag": lags[-1] if lags else 0.0,
+            "schedule_lag_max": max(lags) if lags else 0.0,
+            "latency": _percentiles(list(self._latencies), (0.5, 0.9, 0.99)),
+            "exchanges": self.exchanges,
+            "timeouts": self.timeouts,
+            "reconnects": self.reconnects,
+            "queues": {name: read() for name, read in self._gauges.items()},
+        }
+
+
+def _percentiles(values, quantiles):
+    if not values:
+        return {q: 0.0 for q in quantiles}
+    values.sort()
+    return {q: values[min(len(values) - 1, int(q * len(values)))] for q in quantiles}
+
+
+class MetricsRegistry:
+    """All instruments of a process."""
+
+    def __init__(self):
+        self._instruments = {}
+        self._lock = threading.Lock()
+
+    def instrument(self, name):
+        """Return the metrics of instrument `name`, created on first use."""
+        with self._lock:
+            metrics = self._instruments.get(name)
+            if metrics is None:
+                metrics = self._instruments[name] = InstrumentMetrics(name)
+            return metrics
+
+    def snapshot(self):
+        """Return {instrument name: snapshot dict}."""
+        with self._lock:
+            instruments = list(self._instruments.values())
+        return {m.name: m.snapshot() for m in instruments}
+
+    def prometheus(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, rows):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in rows:
+                text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{text}}} {value:.9g}")
+
+        metric("owon_samples_total", "counter", "Samples acquired.",
+               [({"instrument": n}, s["samples"]) for n, s in snapshot.items()])
+        metric("owon_samples_per_second", "gauge", "Sample rate over the retained samples.",
+               [({"instrument": n}, s["samples_per_sec"]) for n, s in snapshot.items()])
+        metric("owon_schedule_lag_seconds", "gauge", "Lag of the last sample behind its schedule.",
+               [({"instrument": n}, s["schedule_lag"]) for n, s in snapshot.items()])
+        metric("owon_latency_seconds", "summary", "Query round-trip time.",
+               [({"instrument": n, "quantile": q}, v)
+                for n, s in snapshot.items() for q, v in s["latency"].items()])
+        metric("owon_exchanges_total", "counter", "Queries sent.",
+               [({"instrument": n}, s["exchanges"]) for n, s in snapshot.items()])
+        metric("owon_timeouts_total", "counter", "Queries without a complete answer.",
+               [({"instrument": n}, s["timeouts"]) for n, s in snapshot.items()])
+        metric("owon_reconnects_total", "counter", "Port reopened after a disconnect.",
+               [({"instrument": n}, s["reconnects"]) for n, s in snapshot.items()])
+        metric("owon_queue_depth", "gauge", "Items waiting in a queue.",
+               [({"instrument": n, "queue": q}, v)
+                for n, s in snapshot.items() for q, v in s["queues"].items()])
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def attach(device, name, registry=REGISTRY):
+    """
+    Start collecting metrics for `device` (OWONSerial.SCPI,
+    OwenScpi.SCPIInstrument or OwenRecovery.RecoveringSCPI) as `name`.
+    Returns its InstrumentMetrics.
+    """
+    device.metrics = registry.instrument(name)
+    return device.metrics
+
+
+class MetricsServer:
+    """Serves a registry as Prometheus text on http://host:port/metrics."""
+
+    def __init__(self, registry=REGISTRY, host="127.0.0.1", port=9109):
+        registry_ = registry
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry_.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+# MIT License
+
+# Declarative measurement plans for production test.
+#
+# A plan is a list of steps (function, range, rate, sample count or
+# duration, limits) given in Python or JSON:
+#
+#   {"steps": [
+#       {"name": "Vout", "function": "VOLT:DC", "range": "50", "rate": "F",
+#        "samples": 5, "low": 4.9, "high": 5.1},
+#       {"name": "Iq", "function": "CURR:DC", "range": "MIN", "samples": 3,
+#        "high": 200e-6, "after": ["Vout"]}
+#   ]}
+#
+# All command frames are built and validated when the plan is loaded. Steps
+# are reordered (respecting `after`) so the meter switches function, range
+# and rate as few times as possible, the configuration for a step is sent
+# as one batched write, and limits are checked on every reading.
+
+import argparse
+import collections
+import json
+import sys
+import time
+
+import OWONSerial
+from OwenCommands import SCPICommand, VoltageRange, CurrentRange, MeasurementSpeed
+
+
+# Function name -> (configure command, range choices or None for fixed range)
+FUNCTIONS = {
+    "VOLT:DC": (SCPICommand.CONF_VOLT_DC, VoltageRange),
+    "VOLT:AC": (SCPICommand.CONF_VOLT_AC, VoltageRange),
+    "CURR:DC": (SCPICommand.CONF_CURR_DC, CurrentRange),
+    "CURR:AC": (SCPICommand.CONF_CURR_AC, CurrentRange),
+    "RES": (SCPICommand.CONF_RES_AUTO, None),
+    "CAP": (SCPICommand.CONF_CAP_AUTO, None),
+    "FREQ": (SCPICommand.CONF_FREQ, None),
+    "PER": (SCPICommand.CONF_PER, None),
+    "DIOD": (SCPICommand.CONF_DIOD, None),
+    "CONT": (SCPICommand.CONF_CONT, None),
+    "TEMP": (SCPICommand.CONF_TEMP_RTD, None),
+}
+
+StepResult = collections.namedtuple("StepResult", ["name", "passed", "readings", "mean"])
+
+
+def _member(enum, text):
+    """Accept an Enum member, its name ('MID') or its value ('5')."""
+    if isinstance(text, enum):
+        return text
+    text = str(text)
+    if text.upper() in enum.__members__:
+        return enum[text.upper()]
+    return text
+
+
+class Step:
+    """One measurement of a plan. Raises ValueError for invalid settings."""
+
+    def __init__(self, name, function, range="AUTO", rate=None, samples=1, duration=None,
+                 low=None, high=None, after=()):
+        function = function.upper()
+        if function not in FUNCTIONS:
+            raise ValueError(f"Step '{name}': unknown function '{function}'")
+        command, ranges = FUNCTIONS[function]
+        try:
+            if ranges is not None:
+                self.configure = command.build(_member(ranges, range))
+            elif str(range).upper() == "AUTO":
+                self.configure = command.frame
+            else:
+                raise ValueError(f"{function} has no range setting")
+            self.rate_frame = None if rate is None else SCPICommand.RATE.build(_member(MeasurementSpeed, rate))
+        except ValueError as e:
+            raise ValueError(f"Step '{name}': {e}") from None
+
+        self.name = name
+        self.function = function
+        self.range = str(range)
+        self.rate = rate
+        self.samples = samples
+        self.duration = duration
+        self.low = low
+        self.high = high
+        self.after = tuple(after)
+
+    def in_limits(self, value):
+        return (self.low is None or value >= self.low) and (self.high is None or value <= self.high)
+
+
+class Plan:
+    """
+    An ordered collection of steps. With `reorder`, independent steps may
+    run in any order; `after` lists the steps that must run first.
+    """
+
+    def __init__(self, steps, reorder=True, discard=1, stop_on_fail=False):
+        self.steps = list(steps)
+        self.reorder = reorder
+        self.discard = discard              # Readings dropped after a reconfiguration
+        self.stop_on_fail = stop_on_fail
+        names = [s.name for s in self.steps]
+        if len(set(names)) != len(names):
+            raise ValueError("Step names must be unique")
+        for step in self.steps:
+            for dep in step.after:
+                if dep not in names:
+                    raise ValueError(f"Step '{step.name}' runs after unknown step '{dep}'")
+
+    @classmethod
+    def from_json(cls, source):
+        """Load a plan from a JSON file name or a JSON string."""
+        if source.lstrip().startswith("{"):
+            data = json.loads(source)
+        else:
+            with open(source) as file:
+                data = json.load(file)
+        steps = [Step(**step) for step in data.pop("steps")]
+        return cls(steps, **data)
+
+    def ordered(self):
+        """
+        Return the steps in execution order: greedily pick the ready step
+        that needs the fewest setting changes, ties by plan order.
+        """
+        if not self.reorder:
+            return list(self.steps)
+        remaining = list(self.steps)
+        done = set()
+        order = []
+        config = rate = None
+        while remaining:
+            ready = [s for s in remaining if done.issuperset(s.after)]
+            if not ready:
+                raise ValueError("Circular 'after' dependencies in plan")
+            def cost(step):
+                return (2 * (step.function != (config and config.function))
+                        + (step.configure != (config and config.configure))
+                        + (step.rate is not None and step.rate_frame != rate))
+            step = min(ready, key=cost)
+            order.append(step)
+            remaining.remove(step)
+            done.add(step.name)
+            config = step
+            rate = step.rate_frame or rate
+        return order
+
+
+def run_plan(device, plan, log=print):
+    """
+    Execute `plan` on `device` (anything with `sendcmd`, e.g.
+    OWONSerial.SCPI). Returns (results, round_trips).
+    """
+    metrics = getattr(device, "metrics", None)
+    results = []
+    round_trips = 0
+    config = rate = None
+    for step in plan.ordered():
+        # Only send what changed, as one write
+        frames = []
+        if step.configure != config:
+            frames.append(step.configure)
+        if step.rate_frame is not None and step.rate_frame != rate:
+            frames.append(step.rate_frame)
+        if frames:
+            device.sendcmd(b"".join(frames), getdata=False)
+            round_trips += 1
+            for _ in range(plan.discard):
+                device.sendcmd(SCPICommand.MEASURE)
+                round_trips += 1
+        config = step.configure
+        rate = step.rate_frame or rate
+
+        readings = []
+        passed = True
+        start = time.monotonic()
+        while True:
+            value = SCPICommand.MEASURE.parse(device.sendcmd(SCPICommand.MEASURE))
+            round_trips += 1
+            readings.append(value)
+            if metrics is not None:
+                metrics.sample()
+            if not step.in_limits(value):
+                passed = False
+                break
+            if step.duration is not None:
+                if time.monotonic() - start >= step.duration:
+                    break
+            elif len(readings) >= step.samples:
+                break
+
+        mean = sum(readings) / len(readings)
+        results.append(StepResult(step.name, passed, readings, mean))
+        log(f"{step.name:<16} {'PASS' if passed else 'FAIL'}  {mean:12.6g}  ({len(readings)} readings)")
+        if not passed and plan.stop_on_fail:
+            break
+    return results, round_trips
+
+
+def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Run a measurement plan on the XDM1041.")
+    parser.add_argument('plan', help='Plan file (JSON)')
+    parser.add_argument('--port', default='COM3', help='Serial port for the XDM1041 (e.g., COM3 or /dev/ttyUSB0)')
+    parser.add_argument('--baudrate', type=int, default=115200, help='Baud rate for communication (default: 115200)')
+
+    args = parser.parse_args()
+
+    passed = False
+    device = None
+    try:
+        plan = Plan.from_json(args.plan)
+        device = OWONSerial.SCPI(port_dev=args.port, speed=args.baudrate)
+        print(f"Device ID: {device.sendcmd(SCPICommand.IDENTIFY)}")
+
+        start = time.monotonic()
+        results, round_trips = run_plan(device, plan)
+        passed = len(results) == len(plan.steps) and all(r.passed for r in results)
+        print(f"{'PASS' if passed else 'FAIL'} in {time.monotonic() - start:.2f}s, {round_trips} round trips")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        del device
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+# Live plotting for long measurement runs.
+#
+# The acquisition loop runs on a worker thread and only appends to a bounded
+# ring buffer, so it never waits on the GUI. A matplotlib timer drains the
+# ring at a fixed frame rate into one min/max decimator per channel and
+# redraws the lines with blitting. The decimator keeps a fixed number of
+# buckets, so the cost of a frame is the same for 1k or 10M samples.
+
+import collections
+import threading
+
+import matplotlib.pyplot as plt
+
+
+class MinMaxDecimator:
+    """
+    Fixed-size min/max summary of an unbounded sample stream.
+
+    Each bucket covers `width` consecutive samples and keeps their first
+    timestamp, minimum and maximum. When all buckets are used, neighbouring
+    buckets are merged and the width doubles, so memory and drawing cost
+    stay constant for the whole run.
+    """
+
+    def __init__(self, buckets=1000):
+        self.buckets = buckets + (buckets % 2)   # Even, so merging halves exactly
+        self.width = 1
+        self._t = []
+        self._lo = []
+        self._hi = []
+        self._count = 0     # Samples in the last bucket
+
+    def __len__(self):
+        return len(self._t)
+
+    def append(self, t, value):
+        if value != value:
+            return              # nan marks a gap, nothing to draw
+        if self._count and self._count < self.width:
+            if value < self._lo[-1]:
+                self._lo[-1] = value
+            elif value > self._hi[-1]:
+                self._hi[-1] = value
+            self._count += 1
+            return
+        if len(self._t) >= self.buckets:
+            self._merge()
+        self._t.append(t)
+        self._lo.append(value)
+        self._hi.append(value)
+        self._count = 1
+
+    def _merge(self):
+        lo, hi = self._lo, self._hi
+        self._t = self._t[0::2]
+        self._lo = [min(a, b) for a, b in zip(lo[0::2], lo[1::2])]
+        self._hi = [max(a, b) for a, b in zip(hi[0::2], hi[1::2])]
+        self.width *= 2
+
+    def view(self):
+        """
+        Return (x, y) lists that draw the min/max envelope as one polyline,
+        with a vertical stroke per bucket.
+        """
+        x = []
+        y = []
+        for t, lo, hi in zip(self._t, self._lo, self._hi):
+            x.append(t)
+            x.append(t)
+            y.append(lo)
+            y.append(hi)
+        return x, y
+
+    def limits(self):
+        """Return (t_min, t_max, y_min, y_max), or None when empty."""
+        if not self._t:
+            return None
+        return self._t[0], self._t[-1], min(self._lo), max(self._hi)
+
+
+class LivePlot:
+    """
+    Live, blitted plot of one or more channels that share a time axis.
+
+    `channels` is a sequence of (label, unit, color). The acquisition side
+    calls `push(t, v1, v2, ...)`, which only appends to a ring buffer of
+    `capacity` samples; if the GUI falls behind, the oldest unplotted samples
+    are dropped from the display (never from the acquisition). With
+    `metrics` (an OwenMetrics.InstrumentMetrics), the ring fill is reported
+    as queue depth 'plot_ring'.
+    """
+
+    def __init__(self, channels=(("Voltage", "V", "blue"), ("Current", "A", "green")),
+                 fps=10, buckets=1000, capacity=100000, title=None, metrics=None):
+        self.channels = channels
+        self.fps = fps
+        self._ring = collections.deque(maxlen=capacity)
+        self._decimators = [MinMaxDecimator(buckets) for _ in channels]
+        self._stop = threading.Event()
+        self._background = None
+        self._title = title
+        if metrics is not None:
+            metrics.gauge("plot_ring", lambda: len(self._ring))
+
+    @property
+    def stopped(self):
+        """True once the plot window has been closed or `stop()` called."""
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+
+    def push(self, t, *values):
+        """Queue one sample for display. Safe to call from any thread."""
+        self._ring.append((t, values))
+
+    def _setup(self):
+        n = len(self.channels)
+        self.fig, self.axes = plt.subplots(n, 1, sharex=True, figsize=(12, 3 * n), squeeze=False)
+        self.axes = [ax[0] for ax in self.axes]
+        self.lines = []
+        for ax, (label, unit, color) in zip(self.axes, self.channels):
+            line, = ax.plot([], [], color=color, label=f"{label} ({unit})", animated=True)
+            ax.set_ylabel(f"{label} ({unit})")
+            ax.grid(True)
+            ax.legend(loc="upper left")
+            ax.set_xlim(0, 1)
+            ax.set_ylim(0, 1)
+            self.lines.append(line)
+        self.axes[-1].set_xlabel("Time (s)")
+        if self._title:
+            self.fig.suptitle(self._title)
+        self.fig.tight_layout()
+        self.fig.canvas.mpl_connect("draw_event", self._on_draw)
+        self.fig.canvas.mpl_connect("close_event", lambda event: self.stop())
+
+    def _on_draw(self, event):
+        # Static parts (axes, grid, labels) are cached and restored each frame
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for ax, line in zip(self.axes, self.lines):
+            ax.draw_artist(line)
+
+    def _rescale(self):
+        """Grow axis limits when data leaves them. Returns True on change."""
+        changed = False
+        for ax, dec in zip(self.axes, self._decimators):
+            lim = dec.limits()
+            if lim is None:
+                continue
+            t0, t1, y0, y1 = lim
+            x_lo, x_hi = ax.get_xlim()
+            if t1 > x_hi or t0 < x_lo:
+                # Double the span so full redraws stay rare
+                ax.set_xlim(t0, t0 + max(2 * (t1 - t0), 1))
+                changed = True
+            y_lo, y_hi = ax.get_ylim()
+            if y0 < y_lo or y1 > y_hi:
+                margin = max((y1 - y0) * 0.1, abs(y1) * 0.01, 1e-9)
+                ax.set_ylim(y0 - margin, y1 + margin)
+                changed = True
+        return changed
+
+    def _update(self):
+        while self._ring:
+            t, values = self._ring.popleft()
+            for dec, value in zip(self._decimators, values):
+                dec.append(t, value)
+        for line, dec in zip(self.lines, self._decimators):
+            line.set_data(*dec.view())
+
+        canvas = self.fig.canvas
+        if self._rescale() or self._background is None:
+            canvas.draw()       # Full redraw, recaptures the background
+        else:
+            canvas.restore_region(self._background)
+            for ax, line in zip(self.axes, self.lines):
+                ax.draw_artist(line)
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def run(self, acquire):
+        """
+        Run `acquire(plot)` on a worker thread and show the live plot until
+        the window is closed. `acquire` should return when `plot.stopped`.
+        """
+        self._setup()
+        worker = threading.Thread(target=acquire, args=(self,), daemon=True)
+        timer = self.fig.canvas.new_timer(interval=int(1000 / self.fps))
+        timer.add_callback(self._update)
+        worker.start()
+        timer.start()
+        plt.show()
+        self.stop()
+        timer.stop()
+        worker.join()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+# Fault recovery for long unattended runs.
+#
+# RecoveringSCPI wraps an OWONSerial.SCPI and checks every exchange:
+#   - a query must get a complete CR LF terminated frame,
+#   - no bytes may be left over after it (a late answer to an earlier query
+#     means every following reading would be shifted by one),
+#   - measurement answers must parse as a number.
+# On any failure the input buffers are flushed and the link is re-verified
+# with *IDN?. If that fails too, the port is reopened with backoff until the
+# meter is back (unplug / replug, power cycle), the last settings are
+# restored, and the command is retried.
+
+import time
+
+from OwenCommands import SCPICommand, command_text, encode, parse_reading
+
+
+class DesyncError(IOError):
+    """The response stream is out of step with the commands sent."""
+
+
+class RecoveringSCPI:
+    """
+    Drop-in replacement for `OWONSerial.SCPI` that recovers from timeouts,
+    desynced or garbled frames and disconnects instead of failing.
+    Raises IOError if the meter does not answer *IDN? when wrapped.
+    """
+
+    def __init__(self, device, retries=2, reconnect_timeout=3600.0, backoff=(0.5, 10.0)):
+        self.device = device
+        self.retries = retries
+        self.reconnect_timeout = reconnect_timeout
+        self.backoff = backoff
+        self._settings = {}     # Last setting command per header, replayed after reconnect
+        self.resyncs = 0
+        self.reconnects = 0
+        self.device.flush()
+        self.idn = self.device.sendcmd(SCPICommand.IDENTIFY.value)
+        # Every later resync is verified against this answer
+        if not self.device.last_terminated or not self.idn:
+            raise IOError(f"No valid answer to *IDN? (got '{self.idn}')")
+
+    def sendcmd(self, msg, getdata=True):
+        """
+        Send a SCPI command, recovering and retrying on failure. Commands
+        without '?' never wait for a response. Raises IOError only when the
+        command still fails after `retries` recoveries, and ValueError at
+        once for an invalid command.
+        """
+        encode(msg)     # A bad command is the caller's error, not the device's
+        text = command_text(msg)
+        getdata = getdata and "?" in text
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                return self._exchange(msg, text, getdata)
+            except (IOError, OSError) as e:
+                last_error = e
+                print(f"Recovering from: {e}")
+                self.recover()
+        raise IOError(f"'{text}' failed after {self.retries + 1} attempts: {last_error}")
+
+    def _exchange(self, msg, text, getdata):
+        reply = self.device.sendcmd(msg, getdata=getdata)
+        if not getdata:
+            if "?" not in text:
+                self._remember(text)
+            return reply
+        if not self.device.last_terminated:
+            raise DesyncError(f"Timeout waiting for reply to '{text}' (got '{reply}')")
+        if self.device.pending():
+            raise DesyncError(f"Unexpected data after reply to '{text}'")
+        if text.startswith("MEAS"):
+            try:
+                parse_reading(reply)
+            except ValueError:
+                raise DesyncError(f"Garbled reply to '{text}': '{reply}'") from None
+        return reply
+
+    def _remember(self, text):
+        # A batched frame holds several settings, each filed under its own header
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            header = line.split()[0]
+            if header.startswith("CONF"):
+                header = "CONF"     # Any CONF selects the function, last one wins
+            self._settings.pop(header, None)
+            self._settings[header] = line
+
+    @property
+    def metrics(self):
+        return self.device.metrics
+
+    @metrics.setter
+    def metrics(self, value):
+        self.device.metrics = value
+
+    @property
+    def last_terminated(self):
+        return self.device.last_terminated
+
+    @property
+    def transport(self):
+        return self.device.transport
+
+    @transport.setter
+    def transport(self, value):
+        self.device.transport = value
+
+    @property
+    def last_window(self):
+        return self.device.last_window
+
+    @property
+    def last_timestamp(self):
+        return self.device.last_timestamp
+
+    def _verify(self):
+        """Return True if the meter answers *IDN? cleanly and as before."""
+        reply = self.device.sendcmd(SCPICommand.IDENTIFY.value)
+        return self.device.last_terminated and not self.device.pending() and reply == self.idn
+
+    def recover(self):
+        """
+        Resynchronize the link: flush and re-verify, then reopen the port
+        with backoff until the meter answers or `reconnect_timeout` expires.
+        """
+        deadline = time.monotonic() + self.reconnect_timeout
+        delay = self.backoff[0]
+        reopen = False
+        while True:
+            try:
+                if reopen:
+                    self.device.reopen()
+                self.device.flush()
+                if self._verify():
+                    if reopen:
+                        self.reconnects += 1
+                        if self.device.metrics is not None:
+                            self.device.metrics.reconnect()
+                        for cmd in self._settings.values():
+                            self.device.sendcmd(cmd, getdata=False)
+                        print(f"Reconnected, restored {len(self._settings)} setting(s)")
+                    self.resyncs += 1
+                    return
+            except (IOError, OSError) as e:
+                print(f"Device not responding: {e}")
+            if time.monotonic() > deadline:
+                raise IOError(f"Device did not recover within {self.reconnect_timeout} s")
+            reopen = True
+            time.sleep(delay)
+            delay = min(delay * 2, self.backoff[1])
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+# MIT License
+
+# Ripple and noise analysis on captured bursts.
+#
+# capture_burst() reads N samples back to back as fast as the link allows
+# (use RATE F), stamping each at the midpoint of its request/response window.
+# The loop only sends pre-encoded frames and stores raw replies; parsing is
+# done afterwards. analyze_burst() is fully vectorized with NumPy: resampling
+# to uniform spacing, windowed FFT, DC, RMS, peak-to-peak and dominant
+# frequency, in milliseconds even for 100k-sample bursts.
+
+import argparse
+
+import numpy as np
+
+import OWONSerial
+from OwenCommands import SCPICommand, parse_reading
+
+
+def capture_burst(device, samples, cmd=SCPICommand.MEASURE):
+    """
+    Read `samples` readings back to back from `device` (OWONSerial.SCPI,
+    also wrapped in OwenRecovery.RecoveringSCPI). Returns (t, v) arrays;
+    t in seconds from the first reading, v is nan where a reading failed.
+    """
+    if samples <= 0:
+        return np.empty(0), np.empty(0)
+    times = np.empty(samples)
+    replies = [None] * samples
+    sendcmd = device.sendcmd
+    metrics = getattr(device, "metrics", None)
+    for k in range(samples):
+        replies[k] = sendcmd(cmd)
+        if metrics is not None:
+            metrics.sample()
+        start, end = device.last_window
+        times[k] = 0.5 * (start + end)
+        if not device.last_terminated:
+            # sendcmd discards the late answer itself, only the gap is kept
+            replies[k] = None
+
+    values = np.full(samples, np.nan)
+    for k, reply in enumerate(replies):
+        if reply is not None:
+            try:
+                values[k] = parse_reading(reply)
+            except ValueError:
+                pass
+    return times - times[0], values
+
+
+def analyze_burst(t, v, fs=None, window="hann"):
+    """
+    Analyze a burst of readings taken at (possibly irregular) times `t`.
+
+    The burst is resampled to uniform spacing at `fs` (default: from the
+    median sample interval) before the FFT. Returns a dict with 'dc',
+    'rms', 'ac_rms', 'peak_to_peak', 'fs', 'dominant_freq',
+    'dominant_amplitude', and the one-sided amplitude spectrum as 'freqs'
+    and 'spectrum'.
+    """
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(v, dtype=float)
+    good = ~np.isnan(v)
+    t, v = t[good], v[good]
+    if len(v) < 4:
+        raise ValueError("Need at least 4 valid readings")
+
+    dc = v.mean()
+    ac = v - dc
+    if fs is None:
+        fs = 1.0 / np.median(np.diff(t))
+    n = int((t[-1] - t[0]) * fs) + 1
+    uniform = np.interp(t[0] + np.arange(n) / fs, t, ac)
+
+    taper = np.hanning(n) if window == "hann" else np.ones(n)
+    spectrum = np.abs(np.fft.rfft(uniform * taper)) * 2.0 / taper.sum()
+    freqs = np.fft.rfftfreq(n, 1.0 / fs)
+    peak = np.argmax(spectrum[1:]) + 1 if len(spectrum) > 1 else 0
+
+    return {
+        "dc": dc,
+        "rms": np.sqrt(np.mean(v * v)),
+        "ac_rms": np.sqrt(np.mean(ac * ac)),
+        "peak_to_peak": v.max() - v.min(),
+        "fs": fs,
+        "dominant_freq": freqs[peak],
+        "dominant_amplitude": spectrum[peak],
+        "freqs": freqs,
+        "spectrum": spectrum,
+    }
+
+
+def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Ripple and noise analysis with the XDM1041.")
+    parser.add_argument('--port', default='COM3', help='Serial port for the XDM1041 (e.g., COM3 or /dev/ttyUSB0)')
+    parser.add_argument('--baudrate', type=int, default=115200, help='Baud rate for communication (default: 115200)')
+    parser.add_argument('--samples', type=int, default=1000, help='Number of readings in the burst (default: 1000)')
+    parser.add_argument('--ac', action='store_true', help='Measure AC instead of DC voltage')
+    parser.add_argument('--plot', action='store_true', help='Plot the burst and its spectrum')
+
+    args = parser.parse_args()
+
+    device = None
+    try:
+        device = OWONSerial.SCPI(port_dev=args.port, speed=args.baudrate)
+        print(f"Device ID: {device.sendcmd(SCPICommand.IDENTIFY)}")
+        device.sendcmd(SCPICommand.CONF_VOLT_AC_AUTO if args.ac else SCPICommand.CONF_VOLT_DC_AUTO, getdata=False)
+        device.sendcmd(SCPICommand.RATE.build("F"), getdata=False)
+        device.sendcmd(SCPICommand.MEASURE)     # Let the range settle
+
+        print(f"Capturing {args.samples} readings...")
+        t, v = capture_burst(device, args.samples)
+        result = analyze_burst(t, v)
+        print(f"Duration:       {t[-1]:.3f} s ({result['fs']:.1f} S/s)")
+        print(f"DC:             {result['dc']:.6f} V")
+        print(f"RMS:            {result['rms']:.6f} V")
+        print(f"AC RMS:         {result['ac_rms'] * 1000:.3f} mV")
+        print(f"Peak-to-peak:   {result['peak_to_peak'] * 1000:.3f} mV")
+        print(f"Dominant freq:  {result['dominant_freq']:.3f} Hz ({result['dominant_amplitude'] * 1000:.3f} mV)")
+
+        if args.plot:
+            import matplotlib.pyplot as plt
+            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 6))
+            ax1.plot(t, v, color="blue")
+            ax1.set_xlabel("Time (s)")
+            ax1.set_ylabel("Voltage (V)")
+            ax1.grid(True)
+            ax2.semilogy(result["freqs"][1:], result["spectrum"][1:], color="green")
+            ax2.set_xlabel("Frequency (Hz)")
+            ax2.set_ylabel("Amplitude (V)")
+            ax2.grid(True)
+            plt.tight_layout()
+            plt.show()
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        del device
+
+
+if __name__ == "__main__":
+    main()
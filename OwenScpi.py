@@ -5,150 +5,187 @@ Created on Sun Feb  2 16:35:14 2025
 @author: gert
 """
 
+import time
+
 import pyvisa
-from enum import Enum
-
-class VoltageRange(Enum):
-    """Valid voltage ranges for DC and AC modes"""
-    MIN = "50E-3"   # 50mV
-    LOW = "500E-3"  # 500mV
-    MID = "5"       # 5V
-    HIGH = "50"     # 50V
-    MAX = "1000"    # 1000V
-
-class CurrentRange(Enum):
-    """Valid current ranges for DC and AC modes"""
-    MIN = "500E-6"  # 500µA
-    LOW = "5E-3"    # 5mA
-    MID = "500E-3"  # 500mA
-    HIGH = "5"      # 5A
-    MAX = "10"      # 10A
-
-class TemperatureUnit(Enum):
-    """Temperature units"""
-    CELSIUS = "C"
-    FAHRENHEIT = "F"
-    KELVIN = "K"
-
-class MeasurementSpeed(Enum):
-    """Measurement speed settings"""
-    SLOW = "S"
-    MEDIUM = "M"
-    FAST = "F"
+from OwenCommands import SCPICommand, VoltageRange, CurrentRange, TemperatureUnit, MeasurementSpeed, encode, command_text
+from OwenTimeouts import LatencyTracker
 
 class SCPIInstrument:
     """
     Class for communicating with SCPI instruments using PyVISA.
     """
 
-    def __init__(self, resource_name):
-        """Initialize connection to the instrument."""
-        rm = pyvisa.ResourceManager()
-        self.device = rm.open_resource(resource_name)
-        self.device.baud_rate=115200
-        self.device.write_termination = '\n'
-        self.device.read_termination = '\n'
+    LATE_FACTOR = 4     # Learned deadlines within which a late answer is still expected
+
+    def __init__(self, resource_name=None, device=None):
+        """
+        Initialize connection to the instrument, or use `device`: an already
+        configured resource such as `OwenSession.ReplayResource`.
+        """
+        if device is None:
+            rm = pyvisa.ResourceManager()
+            device = rm.open_resource(resource_name)
+            device.baud_rate=115200
+            device.write_termination = '\n'
+            device.read_termination = '\n'
+        self.device = device
+        self.last_window = (0.0, 0.0)
+        # Per-command timeouts learned from latency, starting from the resource's own
+        self._timeout = (getattr(device, "timeout", None) or 2000) / 1000
+        self.timeouts = LatencyTracker(default=self._timeout)
+        self._late_until = None     # A late answer may still arrive until then, see _settle
+        self.metrics = None     # OwenMetrics.InstrumentMetrics, see OwenMetrics.attach
 
     def send_command(self, command):
         """Send a command without expecting a response."""
-        self.device.write(command)
+        if self._late_until is not None:
+            self._settle()
+        self.timeouts.written(command_text(command))
+        self.device.write_raw(encode(command))
 
     def query(self, command):
-        """Send a command and return the response."""
-        return self.device.query(command).strip()
+        """
+        Send a command and return the response. The request/response window
+        (time.perf_counter) is kept in `last_window`.
+        """
+        if self._late_until is not None:
+            self._settle()
+        text = command_text(command)
+        deadline = self.timeouts.timeout(text) * 1000
+        if deadline != self.device.timeout:
+            self.device.timeout = deadline
+        start = time.perf_counter()
+        try:
+            self.device.write_raw(encode(command))
+            reply = self.device.read().strip()
+        except pyvisa.errors.VisaIOError:
+            self.timeouts.timed_out(text)
+            self._late_until = start + min(deadline / 1000 * self.LATE_FACTOR, self._timeout)
+            if self.metrics is not None:
+                self.metrics.exchange(time.perf_counter() - start, True)
+            raise
+        end = time.perf_counter()
+        self.last_window = (start, end)
+        self.timeouts.observe(text, end - start)
+        if self.metrics is not None:
+            self.metrics.exchange(end - start)
+        return reply
+
+    def _settle(self):
+        """
+        Discard the late answer to a query that timed out, so it is not read
+        as the reply to the next one. Only a command sent within LATE_FACTOR
+        deadlines of the timeout waits, until the answer arrives or that
+        window ends.
+        """
+        remaining = self._late_until - time.perf_counter()
+        self._late_until = None
+        if remaining > 0:
+            self.device.timeout = remaining * 1000
+            try:
+                self.device.read()
+            except pyvisa.errors.VisaIOError:
+                pass
+        self.device.flush(pyvisa.constants.BufferOperation.discard_read_buffer)
+
+    @property
+    def last_timestamp(self):
+        """Midpoint of the last query's request/response window."""
+        return 0.5 * (self.last_window[0] + self.last_window[1])
 
     # 🔹 System Commands
     def get_identity(self):
         """Query device identification."""
-        return self.query("*IDN?")
+        return self.query(SCPICommand.IDENTIFY)
 
     def set_remote_mode(self):
         """Switch to remote mode (lock front panel buttons)."""
-        self.send_command("SYST:REM")
+        self.send_command(SCPICommand.REMOTE_MODE)
 
     def set_local_mode(self):
         """Switch to local mode (unlock front panel buttons)."""
-        self.send_command("SYST:LOC")
+        self.send_command(SCPICommand.LOCAL_MODE)
 
     # 🔹 Measurement Commands
     def measure_voltage(self):
         """Query the measured voltage."""
-        return float(self.query("MEAS:VOLT?"))
+        return SCPICommand.MEASURE_VOLT.parse(self.query(SCPICommand.MEASURE_VOLT))
 
     def measure_current(self):
         """Query the measured current."""
-        return float(self.query("MEAS:CURRENT?"))
+        return SCPICommand.MEASURE_CURRENT.parse(self.query(SCPICommand.MEASURE_CURRENT))
 
     def measure_all(self):
         """Query all active measurements."""
-        return self.query("MEAS?")
+        return self.query(SCPICommand.MEASURE)
 
     # Function Selection
     def function(self):
         #Returns the current function on the main display. One of the following:
-        return self.query("FUNC?")
+        return self.query(SCPICommand.FUNCTION)
     
     def funktion1(self):
         #Returns the current function on the main display. One of the following:
-        return self.query("FUNC1?")
+        return self.query(SCPICommand.FUNCTION_1)
 
     def funktion2(self):
         #Returns the current function on the secondary display. One of the following:
-        return self.query("FUNC2?")
+        return self.query(SCPICommand.FUNCTION_2)
 
     # 🔹 Voltage Configuration
     def configure_voltage_dc(self, range_value: VoltageRange):
         """Configure DC voltage measurement with specified range."""
-        self.send_command(f"CONF:VOLT:DC {range_value.value}")
+        self.send_command(SCPICommand.CONF_VOLT_DC.build(range_value))
 
     def configure_voltage_ac(self, range_value: VoltageRange):
         """Configure AC voltage measurement with specified range."""
-        self.send_command(f"CONF:VOLT:AC {range_value.value}")
+        self.send_command(SCPICommand.CONF_VOLT_AC.build(range_value))
 
     # 🔹 Current Configuration
     def configure_current_dc(self, range_value: CurrentRange):
         """Configure DC current measurement with specified range."""
-        self.send_command(f"CONF:CURR:DC {range_value.value}")
+        self.send_command(SCPICommand.CONF_CURR_DC.build(range_value))
 
     def configure_current_ac(self, range_value: CurrentRange):
         """Configure AC current measurement with specified range."""
-        self.send_command(f"CONF:CURR:AC {range_value.value}")
+        self.send_command(SCPICommand.CONF_CURR_AC.build(range_value))
 
     # 🔹 Temperature Configuration
     def set_temperature_unit(self, unit: TemperatureUnit):
         """Set the temperature unit (Celsius, Fahrenheit, Kelvin)."""
-        self.send_command(f"TEMP:RTD:UNIT {unit.value}")
+        self.send_command(SCPICommand.TEMP_RTD_UNIT.build(unit))
 
     def get_temperature_unit(self):
         """Query the current temperature unit."""
-        return self.query("TEMP:RTD:UNIT?")
+        return self.query(SCPICommand.TEMP_RTD_UNIT_QUERY)
 
     # 🔹 Measurement Speed
     def set_measurement_speed(self, speed: MeasurementSpeed):
         """Set measurement speed (slow, medium, fast)."""
-        self.send_command(f"RATE {speed.value}")
+        self.send_command(SCPICommand.RATE.build(speed))
 
     def get_measurement_speed(self):
         """Query measurement speed setting."""
-        return self.query("RATE?")
+        return self.query(SCPICommand.RATE_QUERY)
 
     # 🔹 Beep Control   #Beep command isn't supported
     def beep_on(self):
         """Enable device beep sound."""
-        self.send_command("BEEP:STAT ON") #dos not gives any respons return
+        self.send_command(SCPICommand.BEEP_ON) #dos not gives any respons return
 
     def beep_off(self):
         """Disable device beep sound."""
-        self.send_command("BEEP:STAT OFF")
+        self.send_command(SCPICommand.BEEP_OFF)
 
     def query_beep_status(self):
         """Query if beep is ON or OFF.""" # GIves an error, like the command is not supported
-        return self.query("BEEP:STAT?")
+        return self.query(SCPICommand.BEEP_STATUS)
 
     # 🔹 Reset
     def reset_device(self):
         """Reset the device to factory default settings."""
-        self.send_command("*RST")
+        self.send_command(SCPICommand.RESET)
 
     def close(self):
         """Close the connection to the instrument."""
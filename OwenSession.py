@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+# MIT License
+
+# Session record / replay of the byte-level exchange with the meter.
+#
+# A recording wraps the transport of OWONSerial.SCPI (the pyserial port) or
+# of OwenScpi.SCPIInstrument (the pyvisa resource) and logs every write and
+# read with nanosecond timing. A replay transport feeds the session back,
+# either with the recorded device latency (scaled by `speed`) or as fast as
+# possible, so acquisition loops, parsers and schedulers can be benchmarked
+# and regression tested against real traffic without hardware.
+#
+# File format: the 8 byte MAGIC, then one record per event:
+#     kind (1 byte) | time since start in ns (uint64) | length (uint32) | data
+# all little endian.
+
+import argparse
+import struct
+import time
+
+
+MAGIC = b"OWSESS1\n"
+_HEADER = struct.Struct("<BQI")
+
+WRITE = ord("W")
+READ = ord("R")
+FLUSH_INPUT = ord("I")
+FLUSH_OUTPUT = ord("O")
+IN_WAITING = ord("N")
+
+
+class SessionRecorder:
+    """Appends timed events to a session file."""
+
+    def __init__(self, filename):
+        self._file = open(filename, "wb")
+        self._file.write(MAGIC)
+        self._start = time.perf_counter_ns()
+        self.events = 0
+
+    def add(self, kind, data=b""):
+        self._file.write(_HEADER.pack(kind, time.perf_counter_ns() - self._start, len(data)))
+        self._file.write(data)
+        self.events += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def load_session(filename):
+    """Return the events of a session file as a list of (kind, ns, data)."""
+    with open(filename, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{filename}' is not a session recording")
+        raw = file.read()
+    events = []
+    offset = 0
+    while offset < len(raw):
+        kind, ns, length = _HEADER.unpack_from(raw, offset)
+        offset += _HEADER.size
+        events.append((kind, ns, bytes(raw[offset:offset + length])))
+        offset += length
+    return events
+
+
+class RecordingTransport:
+    """
+    Wraps a pyserial port (or anything with the same interface) and records
+    the exchange. Use `record()` to install it on a device.
+    """
+
+    def __init__(self, inner, filename):
+        self.inner = inner
+        self.recorder = SessionRecorder(filename)
+
+    @property
+    def timeout(self):
+        return self.inner.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.inner.timeout = value
+
+    @property
+    def in_waiting(self):
+        count = self.inner.in_waiting
+        self.recorder.add(IN_WAITING, struct.pack("<I", count))
+        return count
+
+    def write(self, data):
+        self.recorder.add(WRITE, bytes(data))
+        return self.inner.write(data)
+
+    def read(self, size=1):
+        data = self.inner.read(size)
+        self.recorder.add(READ, data)
+        return data
+
+    def read_until(self, expected=b"\n", size=None):
+        data = self.inner.read_until(expected, size)
+        self.recorder.add(READ, data)
+        return data
+
+    def reset_input_buffer(self):
+        self.recorder.add(FLUSH_INPUT)
+        self.inner.reset_input_buffer()
+
+    def reset_output_buffer(self):
+        self.recorder.add(FLUSH_OUTPUT)
+        self.inner.reset_output_buffer()
+
+    def open(self):
+        self.inner.open()
+
+    def close(self):
+        self.inner.close()
+        self.recorder.close()
+
+
+class RecordingResource:
+    """Wraps a pyvisa resource and records the exchange."""
+
+    def __init__(self, inner, filename):
+        self.inner = inner
+        self.recorder = SessionRecorder(filename)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    @property
+    def timeout(self):
+        return self.inner.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.inner.timeout = value
+
+    def write_raw(self, message):
+        self.recorder.add(WRITE, bytes(message))
+        return self.inner.write_raw(message)
+
+    def read_raw(self, size=None):
+        data = self.inner.read_raw(size)
+        self.recorder.add(READ, data)
+        return data
+
+    def read(self):
+        reply = self.inner.read()
+        self.recorder.add(READ, reply.encode("ascii", errors="backslashreplace"))
+        return reply
+
+    def close(self):
+        self.inner.close()
+        self.recorder.close()
+
+
+class SessionPlayer:
+    """
+    Plays back the events of a session file in order.
+
+    `speed` scales the recorded latency between a write and the reads that
+    follow it (1.0 = as recorded, 10.0 = ten times faster); 0 replays as
+    fast as possible. With `strict`, a write that differs from the
+    recording raises ValueError, so a regression shows up at once.
+    """
+
+    def __init__(self, filename, speed=1.0, strict=True):
+        self.events = load_session(filename)
+        self.speed = speed
+        self.strict = strict
+        self.position = 0
+        self._anchor = None     # (perf_counter_ns, recorded ns) of the last write
+
+    def _next(self, kind):
+        # Flush / in_waiting events the replaying code did not ask for are
+        # skipped; writes and reads must match the recording exactly
+        while self.position < len(self.events):
+            event = self.events[self.position]
+            if event[0] == kind:
+                self.position += 1
+                return event
+            if event[0] in (WRITE, READ):
+                if kind not in (WRITE, READ) and not self.strict:
+                    return None
+                raise ValueError(f"Replay diverged at event {self.position}: "
+                                 f"recorded {chr(event[0])}, got {chr(kind)}")
+            self.position += 1
+        raise EOFError("End of recorded session")
+
+    def write(self, data):
+        _, ns, recorded = self._next(WRITE)
+        if self.strict and bytes(data) != recorded:
+            raise ValueError(f"Replay diverged at event {self.position - 1}: "
+                             f"wrote {bytes(data)!r}, recorded {recorded!r}")
+        self._anchor = (time.perf_counter_ns(), ns)
+        return len(data)
+
+    def read(self):
+        _, ns, data = self._next(READ)
+        if self.speed and self._anchor is not None:
+            real, recorded = self._anchor
+            due = real + (ns - recorded) / self.speed
+            delay = (due - time.perf_counter_ns()) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def in_waiting(self):
+        event = self._next(IN_WAITING)
+        return struct.unpack("<I", event[2])[0] if event else 0
+
+    def flush(self, kind):
+        self._next(kind)
+
+    @property
+    def finished(self):
+        return self.position >= len(self.events)
+
+
+class ReplayTransport:
+    """
+    Stand-in for the pyserial port of OWONSerial.SCPI that replays a
+    recorded session: `SCPI(transport=ReplayTransport("run.owsess"))`.
+    """
+
+    def __init__(self, filename, speed=1.0, strict=True):
+        self.player = SessionPlayer(filename, speed, strict)
+        self.timeout = None
+
+    @property
+    def in_waiting(self):
+        return self.player.in_waiting()
+
+    def write(self, data):
+        return self.player.write(data)
+
+    def read(self, size=1):
+        return self.player.read()
+
+    def read_until(self, expected=b"\n", size=None):
+        return self.player.read()
+
+    def reset_input_buffer(self):
+        self.player.flush(FLUSH_INPUT)
+
+    def reset_output_buffer(self):
+        self.player.flush(FLUSH_OUTPUT)
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayResource:
+    """
+    Stand-in for the pyvisa resource of OwenScpi.SCPIInstrument:
+    `SCPIInstrument(device=ReplayResource("run.owsess"))`.
+    """
+
+    def __init__(self, filename, speed=1.0, strict=True):
+        self.player = SessionPlayer(filename, speed, strict)
+        self.timeout = None
+
+    def write_raw(self, message):
+        return self.player.write(message)
+
+    def read_raw(self, size=None):
+        return self.player.read()
+
+    def read(self):
+        return self.player.read().decode("ascii", errors="backslashreplace")
+
+    def flush(self, mask):
+        pass
+
+    def close(self):
+        pass
+
+
+def record(device, filename):
+    """
+    Start recording the exchange of an OWONSerial.SCPI (also wrapped in
+    OwenRecovery.RecoveringSCPI) or an OwenScpi.SCPIInstrument into
+    `filename`. Returns the recorder. Raises TypeError for other objects.
+    """
+    if hasattr(device, "transport"):
+        device.transport = RecordingTransport(device.transport, filename)
+        return device.transport.recorder
+    if hasattr(getattr(device, "device", None), "write_raw"):
+        device.device = RecordingResource(device.device, filename)
+        return device.device.recorder
+    raise TypeError(f"Cannot record the exchange of a {type(device).__name__}")
+
+
+def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Show the contents of a recorded session.")
+    parser.add_argument('filename', help='Session file')
+
+    args = parser.parse_args()
+
+    events = load_session(args.filename)
+    for kind, ns, data in events:
+        print(f"{ns / 1e6:12.3f} ms  {chr(kind)}  {data!r}")
+    print(f"{len(events)} events")
+
+
+if __name__ == "__main__":
+    main()
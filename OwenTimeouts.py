@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+# Adaptive per-command timeouts.
+#
+# A fixed timeout is either far too long for `MEAS?` at RATE F (a lost
+# answer costs seconds) or too short for RATE S and autoranging (spurious
+# timeouts). LatencyTracker keeps a window of observed round-trip times per
+# (command, rate) and derives each deadline from it as
+#     clamp(percentile x factor, floor, ceiling)
+# The first query after a function / range change is tracked separately,
+# since autoranging makes it slower. Until a key has `min_samples`
+# observations the per-rate default is used; explicit overrides always win.
+# A timeout doubles the deadline for that key (up to `max_backoff` times)
+# until the next success.
+
+import collections
+
+
+# Deadline in seconds used before enough latency has been observed
+DEFAULT_TIMEOUTS = {"S": 2.0, "M": 1.0, "F": 0.5, None: 2.0}
+
+# Setting changes after which the next reading may take longer
+_SETTLING = ("CONF", "RANGE", "AUTO")
+
+
+class _Key:
+    __slots__ = ("samples", "deadline", "backoff", "pending")
+
+    def __init__(self, window):
+        self.samples = collections.deque(maxlen=window)
+        self.deadline = None
+        self.backoff = 1.0
+        self.pending = 0        # Observations since the deadline was computed
+
+
+class LatencyTracker:
+    """
+    Running latency estimate and timeout per command and measurement rate.
+
+    `overrides` maps a command (e.g. "*IDN?") to a fixed timeout in
+    seconds. `default` replaces the per-rate defaults when given.
+    """
+
+    def __init__(self, factor=3.0, percentile=0.99, window=200, min_samples=20,
+                 floor=0.05, ceiling=10.0, max_backoff=8.0, default=None, overrides=None):
+        self.factor = factor
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.floor = floor
+        self.ceiling = ceiling
+        self.max_backoff = max_backoff
+        self.default = default
+        self.overrides = dict(overrides or {})
+        self.rate = None
+        self._settling = False
+        self._keys = {}
+
+    def _key(self, cmd):
+        key = (cmd, self.rate, self._settling)
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = _Key(self.window)
+        return entry
+
+    def timeout(self, cmd):
+        """Return the deadline in seconds for the query `cmd`."""
+        override = self.overrides.get(cmd)
+        if override is not None:
+            return override
+        entry = self._key(cmd)
+        if entry.deadline is None or entry.pending >= 16 or len(entry.samples) == self.min_samples:
+            entry.deadline = self._estimate(entry)
+            entry.pending = 0
+        return min(entry.deadline * entry.backoff, self.ceiling)
+
+    def _estimate(self, entry):
+        if len(entry.samples) < self.min_samples:
+            if self.default is not None:
+                return self.default
+            return DEFAULT_TIMEOUTS.get(self.rate, DEFAULT_TIMEOUTS[None])
+        ordered = sorted(entry.samples)
+        p = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+        return min(max(p * self.factor, self.floor), self.ceiling)
+
+    def observe(self, cmd, latency):
+        """Record the round-trip time of a successful query."""
+        entry = self._key(cmd)
+        entry.samples.append(latency)
+        entry.pending += 1
+        if entry.backoff != 1.0:
+            entry.backoff = 1.0
+            entry.deadline = None
+        self._settling = False
+
+    def timed_out(self, cmd):
+        """Record a query that got no complete answer within its deadline."""
+        entry = self._key(cmd)
+        entry.backoff = min(entry.backoff * 2, self.max_backoff)
+        self._settling = False
+
+    def written(self, text):
+        """Track setting commands that change the expected latency."""
+        for line in text.splitlines():
+            header, _, arg = line.strip().partition(" ")
+            if header == "RATE":
+                self.rate = arg.strip().upper()[:1] or None
+            elif header.startswith(_SETTLING):
+                self._settling = True
+
+    def snapshot(self):
+        """Return {(command, rate, settling): (samples, timeout)}."""
+        return {key: (len(entry.samples), self._estimate(entry)) for key, entry in self._keys.items()}
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+# MIT License
+
+# Threshold-triggered capture on the acquisition stream.
+#
+# While armed, the engine samples at `armed_interval` and keeps the last
+# `pre` samples in a ring buffer. When a condition fires, it switches to
+# full rate (interval 0) for `post` seconds, then emits a TriggerEvent with
+# the pre- and post-trigger samples and re-arms (or stops the run). Outside
+# events only one sample per `log_interval` is marked for the coarse log.
+
+import argparse
+import collections
+import csv
+import datetime
+import time
+
+import OWONSerial
+from OWONSerial import SCPICommand
+
+
+TriggerEvent = collections.namedtuple(
+    "TriggerEvent", ["time", "condition", "channel", "value", "channels", "samples", "trigger_index",
+                     "truncated"], defaults=(False,))
+TriggerEvent.__doc__ = """
+A captured event. `samples` is a list of (t, values) covering the
+pre-trigger buffer followed by the post-trigger window;
+`samples[trigger_index]` is the sample that fired the trigger.
+`truncated` is True if the run ended before the post window was full.
+"""
+
+
+class LevelTrigger:
+    """Fires while the channel is above (or below) `level`."""
+
+    def __init__(self, channel, level, above=True):
+        self.channel = channel
+        self.level = level
+        self.above = above
+
+    def __str__(self):
+        return f"level {self.channel} {'>' if self.above else '<'} {self.level}"
+
+    def check(self, t, value, prev_t, prev_value):
+        return value > self.level if self.above else value < self.level
+
+
+class EdgeTrigger:
+    """Fires when the channel crosses `level` in the given direction."""
+
+    def __init__(self, channel, level, rising=True):
+        self.channel = channel
+        self.level = level
+        self.rising = rising
+
+    def __str__(self):
+        return f"{'rising' if self.rising else 'falling'} edge {self.channel} @ {self.level}"
+
+    def check(self, t, value, prev_t, prev_value):
+        if prev_value is None:
+            return False
+        if self.rising:
+            return prev_value < self.level <= value
+        return prev_value > self.level >= value
+
+
+class WindowTrigger:
+    """Fires when the channel is outside [low, high] (or inside if `inside`)."""
+
+    def __init__(self, channel, low, high, inside=False):
+        self.channel = channel
+        self.low = low
+        self.high = high
+        self.inside = inside
+
+    def __str__(self):
+        return f"window {self.channel} {'in' if self.inside else 'out of'} [{self.low}, {self.high}]"
+
+    def check(self, t, value, prev_t, prev_value):
+        return (self.low <= value <= self.high) == self.inside
+
+
+class SlopeTrigger:
+    """
+    Fires when the channel changes faster than `rate` units per second,
+    rising for a positive `rate` and falling for a negative one.
+    """
+
+    def __init__(self, channel, rate):
+        self.channel = channel
+        self.rate = rate
+
+    def __str__(self):
+        return f"slope {self.channel} {'>' if self.rate > 0 else '<'} {self.rate}/s"
+
+    def check(self, t, value, prev_t, prev_value):
+        if prev_value is None or t <= prev_t:
+            return False
+        slope = (value - prev_value) / (t - prev_t)
+        return slope > self.rate if self.rate > 0 else slope < self.rate
+
+
+class TriggerEngine:
+    """
+    Evaluates trigger conditions on a stream of samples.
+
+    Feed every sample with `process(t, *values)`, in the order of
+    `channels`, and sleep `interval` seconds before the next one.
+    """
+
+    ARMED = "armed"
+    CAPTURING = "capturing"
+    HOLDOFF = "holdoff"
+
+    def __init__(self, channels, conditions, pre=100, post=2.0, armed_interval=1.0,
+                 log_interval=60.0, holdoff=0.0, stop_on_trigger=False, on_event=None):
+        self.channels = tuple(channels)
+        self.conditions = [(c, self.channels.index(c.channel)) for c in conditions]
+        self.post = post
+        self.armed_interval = armed_interval
+        self.log_interval = log_interval
+        self.holdoff = holdoff
+        self.stop_on_trigger = stop_on_trigger
+        self.on_event = on_event
+        self.state = self.ARMED
+        self.stopped = False
+        self.events = []
+        self._pre = collections.deque(maxlen=pre + 1)   # +1 for the trigger sample
+        self._capture = None
+        self._fired = None
+        self._until = None
+        self._prev = None
+        self._last_logged = None
+
+    @property
+    def interval(self):
+        """Seconds to wait before the next sample: 0 (full rate) while capturing."""
+        return 0 if self.state == self.CAPTURING else self.armed_interval
+
+    def process(self, t, *values):
+        """
+        Feed one sample. Returns True if it belongs in the coarse log, i.e.
+        it is the first sample after `log_interval` seconds.
+        """
+        sample = (t, values)
+        if self.state == self.CAPTURING:
+            self._capture.append(sample)
+            if t >= self._until:
+                self._finish(t)
+        else:
+            self._pre.append(sample)
+            if self.state == self.HOLDOFF and t >= self._until:
+                self.state = self.ARMED
+            if self.state == self.ARMED:
+                self._evaluate(sample)
+        self._prev = sample
+
+        if self._last_logged is None or t - self._last_logged >= self.log_interval:
+            self._last_logged = t
+            return True
+        return False
+
+    def _evaluate(self, sample):
+        t, values = sample
+        prev_t, prev_values = self._prev if self._prev else (None, None)
+        for condition, index in self.conditions:
+            prev_value = prev_values[index] if prev_values else None
+            if condition.check(t, values[index], prev_t, prev_value):
+                self._fired = (t, condition, values[index])
+                self._capture = list(self._pre)
+                self._until = t + self.post
+                self.state = self.CAPTURING
+                return
+
+    def flush(self, t):
+        """
+        Emit the event being captured, if any, as a truncated event. Call
+        this when the run ends at time `t`.
+        """
+        if self.state == self.CAPTURING:
+            self._finish(t, truncated=True)
+
+    def _finish(self, t, truncated=False):
+        fired_t, condition, value = self._fired
+        event = TriggerEvent(fired_t, str(condition), condition.channel, value,
+                             self.channels, self._capture, len(self._pre) - 1, truncated)
+        self.events.append(event)
+        self._pre.clear()
+        self._capture = None
+        self.state = self.HOLDOFF
+        self._until = t + self.holdoff
+        if self.stop_on_trigger:
+            self.stopped = True
+        if self.on_event is not None:
+            self.on_event(event)
+
+
+def save_event(event, filename):
+    """Write the samples of a TriggerEvent to a CSV file."""
+    with open(filename, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Time"] + list(event.channels) + ["Trigger"])
+        for i, (t, values) in enumerate(event.samples):
+            writer.writerow([t] + list(values) + [1 if i == event.trigger_index else 0])
+
+
+def run_triggered(read, engine, duration, log=print, metrics=None):
+    """
+    Acquisition loop: call `read()` for a tuple of channel values at the
+    rate the engine asks for, until `duration` seconds have passed or the
+    engine stops. Coarse samples are passed to `log(t, values)`. An event
+    still being captured when `duration` runs out is emitted truncated.
+    Samples and their lag are counted in `metrics` if given.
+    """
+    start_time = time.monotonic()
+    due = 0.0
+    while not engine.stopped:
+        cycle_start = time.monotonic()
+        t = cycle_start - start_time
+        if t >= duration:
+            break
+        values = read()
+        if metrics is not None:
+            metrics.sample(max(0.0, t - due))
+        if engine.process(t, *values):
+            log(t, values)
+        due = t + engine.interval
+        time.sleep(max(0, engine.interval - (time.monotonic() - cycle_start)))
+    engine.flush(time.monotonic() - start_time)
+    return engine.events
+
+
+def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Capture voltage events on the XDM1041.")
+    parser.add_argument('--port', default='COM3', help='Serial port for the XDM1041 (e.g., COM3 or /dev/ttyUSB0)')
+    parser.add_argument('--baudrate', type=int, default=115200, help='Baud rate for communication (default: 115200)')
+    parser.add_argument('--duration', type=int, default=7200, help='Duration of the run in seconds (default: 7200)')
+    parser.add_argument('--interval', type=float, default=1.0, help='Sample interval while armed, in seconds (default: 1.0)')
+    parser.add_argument('--log-interval', type=float, default=60.0, help='Interval of the coarse log in seconds (default: 60)')
+    parser.add_argument('--cutoff', type=float, required=True, help='Voltage level that triggers a capture')
+    parser.add_argument('--rising', action='store_true', help='Trigger on a rising instead of a falling edge')
+    parser.add_argument('--pre', type=int, default=100, help='Samples kept before the trigger (default: 100)')
+    parser.add_argument('--post', type=float, default=5.0, help='Seconds captured at full rate after the trigger (default: 5)')
+    parser.add_argument('--stop', action='store_true', help='Stop the run after the first event')
+
+    args = parser.parse_args()
+
+    def on_event(event):
+        filename = datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + "_event.dat"
+        save_event(event, filename)
+        print(f"Event at {event.time:.2f}s: {event.condition} ({event.value:.5f} V), "
+              f"{len(event.samples)} samples{' (truncated)' if event.truncated else ''} saved as '{filename}'")
+
+    device = None
+    try:
+        device = OWONSerial.SCPI(port_dev=args.port, speed=args.baudrate)
+        print(f"Connected to device on port {args.port}")
+        print(f"Device ID: {device.sendcmd(SCPICommand.IDENTIFY.value)}")
+        device.sendcmd(SCPICommand.CONF_VOLT_DC_AUTO.value, getdata=False)
+
+        engine = TriggerEngine(
+            ("voltage",), [EdgeTrigger("voltage", args.cutoff, rising=args.rising)],
+            pre=args.pre, post=args.post, armed_interval=args.interval,
+            log_interval=args.log_interval, stop_on_trigger=args.stop, on_event=on_event)
+        read = lambda: (float(device.sendcmd(SCPICommand.MEASURE.value).replace('V', '')),)
+        log = lambda t, values: print(f"{t:8.1f}, {values[0]:9.5f}")
+
+        print("Time (s), Voltage (V)")
+        events = run_triggered(read, engine, args.duration, log, device.metrics)
+        print(f"Run completed, {len(events)} event(s) captured.")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        del device
+
+
+if __name__ == "__main__":
+    main()
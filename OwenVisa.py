@@ -13,37 +13,7 @@ Updated to use PyVISA instead of pyserial
 import pyvisa
 import argparse
 import time
-from enum import Enum
-
-
-class SCPICommand(Enum):
-    # System Commands
-    IDENTIFY = "*IDN?"                  # Query device identification (manufacturer, model, serial number, firmware version)
-    REMOTE_MODE = "SYST:REM"            # Set device to remote control mode
-    LOCAL_MODE = "SYST:LOC"             # Return device to local (manual) control mode
-
-    # Measurement Commands
-    MEASURE = "MEAS?"                   # Query the latest measurement (depends on the current function mode)
-    MEASURE_VOLT = "MEAS:VOLT?"         # Query the measured voltage
-    MEASURE_CURRENT = "MEAS:CURRENT?"   # Query the measured current
-
-    # Function Selection
-    FUNCTION = "FUNC?"                  # Query the current function mode (Voltage, Current, Resistance, etc.)
-
-    # Configuration Commands
-    CONF_VOLT_DC_AUTO = "CONF:VOLT:DC AUTO"  # Configure voltage measurement in DC auto-ranging mode
-    CONF_VOLT_DC = "CONF:VOLT:DC"       # Configure voltage measurement in DC mode (manual range)
-    CONF_CURR_DC_AUTO = "CONF:CURR:DC AUTO"  # Configure current measurement in DC auto-ranging mode
-    CONF_CURR_DC = "CONF:CURR:DC"       # Configure current measurement in DC mode (manual range)
-    CONF_RES_AUTO = "CONF:RES AUTO"     # Configure resistance measurement in auto-ranging mode
-
-    # Beep Control
-    BEEP_ON = "BEEP:STAT ON"            # Enable device beep sound
-    BEEP_OFF = "BEEP:STAT OFF"          # Disable device beep sound
-
-    # Reset
-    RESET = "*RST"                      # Reset the device to factory default settings
-
+from OwenCommands import SCPICommand
 
 
 def measure_voltage_current(device, duration, interval):
@@ -61,14 +31,16 @@ def measure_voltage_current(device, duration, interval):
             cycle_start = time.time()
 
             # Measure voltage
-            device.write (SCPICommand.CONF_VOLT_DC_AUTO.value)
+            device.write_raw(SCPICommand.CONF_VOLT_DC_AUTO.frame)
             time.sleep(cycle_time/2)
-            voltage = float(device.query(SCPICommand.MEASURE_VOLT.value).replace('V', ''))
+            device.write_raw(SCPICommand.MEASURE_VOLT.frame)
+            voltage = SCPICommand.MEASURE_VOLT.parse(device.read())
 
             # Measure current
-            device.write(SCPICommand.CONF_CURR_DC_AUTO.value)
+            device.write_raw(SCPICommand.CONF_CURR_DC_AUTO.frame)
             time.sleep(cycle_time/2)
-            current = float(device.query(SCPICommand.MEASURE_CURRENT.value).replace('A', ''))
+            device.write_raw(SCPICommand.MEASURE_CURRENT.frame)
+            current = SCPICommand.MEASURE_CURRENT.parse(device.read())
             elapsed_time = time.time()-start_time
             print(f"{elapsed_time:6.1f}, {voltage:9.5f}, {current:9.5f}")
 
@@ -96,7 +68,7 @@ def main():
         print(rm.list_resources())
         OWON=rm.open_resource(resource_name=args.resource)
         OWON.baud_rate=115200 # this is how to make it run with visa !!!!
-        print(OWON.query("*IDN?"))        
+        print(OWON.query(SCPICommand.IDENTIFY.value))        
         # Perform voltage and current measurements
         measure_voltage_current(OWON, args.duration, args.interval)
 